@@ -15,14 +15,20 @@
              'data/account_journal_data.xml',
              'data/ir_sequence_data.xml',
              'data/treasury_security_type_data.xml',
+             'data/ir_cron_data.xml',
+             'data/treasury_check_layout_data.xml',
              'report/print_check.xml',
              'report/check_report.xml',
              'views/treasury_checkbook_views.xml',
              'views/treasury_outgoing_views.xml',
              'views/treasury_incoming_views.xml',
+             'views/treasury_aging_report_views.xml',
+             'views/treasury_cash_forecast_views.xml',
+             'views/treasury_check_layout_views.xml',
              'views/treasury_menus.xml',
              'views/res_config_settings_views.xml',
              'views/res_company_views.xml',
+             'views/account_journal_views.xml',
              ],
     'demo': [],
     'installable': True,
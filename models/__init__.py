@@ -3,6 +3,11 @@ from . import treasury_entry
 from . import treasury_outgoing
 from . import treasury_incoming
 from . import treasury_security_type
+from . import treasury_aging_report
+from . import treasury_cash_forecast
+from . import treasury_check_layout
 from . import res_config_settings
 from . import res_company
 from . import account_move_line
+from . import account_journal
+from . import ir_actions_report
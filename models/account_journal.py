@@ -0,0 +1,13 @@
+from odoo import models, fields
+
+
+class AccountJournal(models.Model):
+    _inherit = 'account.journal'
+
+    check_print_mode = fields.Selection(selection=[
+        ('qweb', 'Report (wkhtmltopdf)'),
+        ('native', 'Native PDF')],
+        string='Check Printing', default='qweb', required=True,
+        help='Native PDF draws the checks directly, without spawning wkhtmltopdf.')
+    check_layout_id = fields.Many2one(comodel_name='treasury.check.layout', string='Check Layout',
+                                      help='Positions of the printed check fields, the default layout if empty.')
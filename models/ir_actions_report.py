@@ -0,0 +1,16 @@
+from odoo import models
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    _check_reports = ('treasury.print_check', 'treasury.print_check_bulk')
+
+    def _render_qweb_pdf(self, res_ids=None, data=None):
+        if self.report_name in self._check_reports and res_ids:
+            checks = self.env['treasury.outgoing'].browse(res_ids)
+            journals = checks.mapped('checkbook_id.journal_id')
+            if journals and set(journals.mapped('check_print_mode')) == {'native'} and \
+                    all(check.checkbook_id for check in checks):
+                return checks._render_check_pdf(), 'pdf'
+        return super()._render_qweb_pdf(res_ids=res_ids, data=data)
@@ -0,0 +1,81 @@
+from odoo import api, fields, models, tools
+
+
+class TreasuryAgingReport(models.Model):
+    _name = "treasury.aging.report"
+    _description = "Treasury Due Date Aging Report"
+    _auto = False
+    _order = 'direction, partner_id'
+
+    direction = fields.Selection(selection=[
+        ('incoming', 'Incoming'),
+        ('outgoing', 'Outgoing')],
+        string='Direction', readonly=True)
+    partner_id = fields.Many2one(comodel_name='res.partner', string='Partner', readonly=True)
+    company_id = fields.Many2one(comodel_name='res.company', string='company', readonly=True)
+    currency_id = fields.Many2one(comodel_name='res.currency', string='currency', readonly=True)
+    security_type_id = fields.Many2one(comodel_name='treasury.security_type', string='Security type', readonly=True)
+    overdue_90 = fields.Monetary(string='Overdue > 90 Days', readonly=True)
+    overdue_60 = fields.Monetary(string='Overdue 61-90 Days', readonly=True)
+    overdue_30 = fields.Monetary(string='Overdue 31-60 Days', readonly=True)
+    overdue = fields.Monetary(string='Overdue 1-30 Days', readonly=True)
+    due = fields.Monetary(string='Due Today', readonly=True)
+    next_7 = fields.Monetary(string='Next 7 Days', readonly=True)
+    next_30 = fields.Monetary(string='Next 8-30 Days', readonly=True)
+    next_90 = fields.Monetary(string='Next 31-90 Days', readonly=True)
+    later = fields.Monetary(string='Later', readonly=True)
+    amount_total = fields.Monetary(string='Total', readonly=True)
+
+    # open, non guaranty securities are the exposure of the company
+    _incoming_states = ('undeposited', 'in_bank', 'bounced', 'sued')
+    _outgoing_states = ('issued', 'delivered', 'bounced')
+
+    def _query(self):
+        buckets = {
+            'overdue_90': 'age > 90',
+            'overdue_60': 'age > 60 AND age <= 90',
+            'overdue_30': 'age > 30 AND age <= 60',
+            'overdue': 'age > 0 AND age <= 30',
+            'due': 'age = 0',
+            'next_7': 'age < 0 AND age >= -7',
+            'next_30': 'age < -7 AND age >= -30',
+            'next_90': 'age < -30 AND age >= -90',
+            'later': 'age < -90 OR age IS NULL',
+        }
+        bucket_columns = ',\n'.join(
+            'COALESCE(SUM(amount) FILTER (WHERE {}), 0) AS {}'.format(condition, column)
+            for column, condition in buckets.items())
+        return """
+            SELECT ROW_NUMBER() OVER (ORDER BY direction, partner_id, company_id, currency_id, security_type_id) AS id,
+                   direction, partner_id, company_id, currency_id, security_type_id,
+                   {bucket_columns},
+                   COALESCE(SUM(amount), 0) AS amount_total
+              FROM (
+                    SELECT 'incoming' AS direction, consignee_id AS partner_id, company_id, currency_id,
+                           security_type_id, amount, CURRENT_DATE - due_date AS age
+                      FROM treasury_incoming
+                     WHERE state IN {incoming_states} AND guaranty IS NOT TRUE
+                     UNION ALL
+                    SELECT 'outgoing' AS direction, beneficiary_id AS partner_id, company_id, currency_id,
+                           security_type_id, amount, CURRENT_DATE - due_date AS age
+                      FROM treasury_outgoing
+                     WHERE state IN {outgoing_states} AND guaranty IS NOT TRUE
+                   ) securities
+          GROUP BY direction, partner_id, company_id, currency_id, security_type_id
+        """.format(bucket_columns=bucket_columns,
+                   incoming_states=tuple(self._incoming_states),
+                   outgoing_states=tuple(self._outgoing_states))
+
+    def init(self):
+        self.env.cr.execute("DROP MATERIALIZED VIEW IF EXISTS %s CASCADE" % self._table)
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("CREATE MATERIALIZED VIEW %s AS (%s)" % (self._table, self._query()))
+        self.env.cr.execute("CREATE UNIQUE INDEX %s_id_index ON %s (id)" % (self._table, self._table))
+
+    @api.model
+    def _refresh_view(self):
+        """Refresh the report without blocking readers; the buckets are relative to the refresh date."""
+        self.env['treasury.incoming'].flush(['state', 'amount', 'due_date', 'guaranty'])
+        self.env['treasury.outgoing'].flush(['state', 'amount', 'due_date', 'guaranty'])
+        self.env.cr.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY %s" % self._table)
+        self.invalidate_cache()
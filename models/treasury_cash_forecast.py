@@ -0,0 +1,125 @@
+from odoo import api, fields, models
+from odoo.addons.treasury.tools import jadatetime as jd
+
+
+class TreasuryCashForecast(models.Model):
+    _name = "treasury.cash.forecast"
+    _description = "Treasury Cash Flow Forecast"
+    _order = 'period_type, date_from, company_id'
+
+    period_type = fields.Selection(selection=[
+        ('month', 'Month'),
+        ('quarter', 'Quarter')],
+        string='Period Type', readonly=True, index=True)
+    period = fields.Char(string='Period', readonly=True)
+    date_from = fields.Date(string='From', readonly=True, index=True)
+    date_to = fields.Date(string='To', readonly=True)
+    company_id = fields.Many2one(comodel_name='res.company', string='company', readonly=True, index=True)
+    currency_id = fields.Many2one(comodel_name='res.currency', string='currency', readonly=True)
+    outgoing_amount = fields.Monetary(string='Outgoing', readonly=True)
+    incoming_amount = fields.Monetary(string='Incoming', readonly=True)
+    net_amount = fields.Monetary(string='Net Outflow', readonly=True)
+
+    # securities which are still expected to move cash, guaranties excluded
+    _incoming_states = ('undeposited', 'in_bank')
+    _outgoing_states = ('issued', 'delivered')
+    _period_types = ('month', 'quarter')
+    _sql_constraints = [('unique_period', 'unique(company_id, currency_id, period_type, date_from)',
+                         'The forecast has one row per company, currency and period!')]
+
+    def init(self):
+        # securities registered before the forecast existed, or while it was not maintained
+        self._rebuild()
+
+    @api.model
+    def _get_periods(self, due_date):
+        """Return (period_type, period, date_from, date_to) of the Jalali periods containing ``due_date``."""
+        jdate = jd.date.fromgregorian(date=due_date)
+        periods = []
+        for period_type in self._period_types:
+            date_from, date_to = jdate.get_period_in_gregorian(period_type)
+            if period_type == 'month':
+                period = '{}/{:02d}'.format(jdate.year, jdate.month)
+            else:
+                period = '{} Q{}'.format(jdate.year, jdate.quarter())
+            periods.append((period_type, period, date_from, date_to))
+        return periods
+
+    @api.model
+    def _refresh_periods(self, keys):
+        """Recompute the forecast rows of the periods touched by ``keys``.
+
+        :param keys: iterable of (company_id, due_date) of the securities that changed
+        """
+        periods_by_date = {}
+        periods = set()
+        for company_id, due_date in keys:
+            if not (company_id and due_date):
+                continue
+            if due_date not in periods_by_date:
+                periods_by_date[due_date] = self._get_periods(due_date)
+            periods.update((company_id,) + period for period in periods_by_date[due_date])
+        if not periods:
+            return
+
+        self.env['treasury.incoming'].flush(['state', 'amount', 'due_date', 'guaranty', 'company_id', 'currency_id'])
+        self.env['treasury.outgoing'].flush(['state', 'amount', 'due_date', 'guaranty', 'company_id', 'currency_id'])
+        self.flush()
+        cr = self.env.cr
+        # securities without a currency are forecast in their company currency, so that every row has a
+        # currency and concurrent refreshes of a period meet on the unique constraint instead of duplicating it
+        values = ', '.join(cr.mogrify("(%s, %s, %s, %s::date, %s::date)", period).decode() for period in periods)
+        cr.execute("""
+            DELETE FROM treasury_cash_forecast forecast
+             USING (VALUES {values}) AS p(company_id, period_type, period, date_from, date_to)
+             WHERE forecast.company_id = p.company_id
+               AND forecast.period_type = p.period_type
+               AND forecast.date_from = p.date_from
+        """.format(values=values))
+        cr.execute("""
+            INSERT INTO treasury_cash_forecast (company_id, currency_id, period_type, period, date_from, date_to,
+                                                outgoing_amount, incoming_amount, net_amount,
+                                                create_uid, create_date, write_uid, write_date)
+                 SELECT p.company_id, COALESCE(s.currency_id, company.currency_id), p.period_type, p.period,
+                        p.date_from, p.date_to,
+                        SUM(s.outgoing_amount), SUM(s.incoming_amount),
+                        SUM(s.outgoing_amount) - SUM(s.incoming_amount),
+                        %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                   FROM (VALUES {values}) AS p(company_id, period_type, period, date_from, date_to)
+                   JOIN (
+                         SELECT company_id, currency_id, due_date, amount AS outgoing_amount, 0 AS incoming_amount
+                           FROM treasury_outgoing
+                          WHERE state IN %(outgoing_states)s AND guaranty IS NOT TRUE
+                          UNION ALL
+                         SELECT company_id, currency_id, due_date, 0 AS outgoing_amount, amount AS incoming_amount
+                           FROM treasury_incoming
+                          WHERE state IN %(incoming_states)s AND guaranty IS NOT TRUE
+                        ) s ON s.company_id = p.company_id AND s.due_date BETWEEN p.date_from AND p.date_to
+                   JOIN res_company company ON company.id = p.company_id
+               GROUP BY p.company_id, COALESCE(s.currency_id, company.currency_id), p.period_type, p.period,
+                        p.date_from, p.date_to
+            ON CONFLICT (company_id, currency_id, period_type, date_from) DO UPDATE
+               SET outgoing_amount = EXCLUDED.outgoing_amount,
+                   incoming_amount = EXCLUDED.incoming_amount,
+                   net_amount = EXCLUDED.net_amount,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """.format(values=values), {
+            'uid': self.env.uid,
+            'outgoing_states': self._outgoing_states,
+            'incoming_states': self._incoming_states,
+        })
+        self.invalidate_cache()
+
+    @api.model
+    def _rebuild(self):
+        """Recompute the whole forecast from the securities tables."""
+        self.env['treasury.incoming'].flush(['due_date', 'company_id'])
+        self.env['treasury.outgoing'].flush(['due_date', 'company_id'])
+        self.env.cr.execute("DELETE FROM treasury_cash_forecast")
+        self.env.cr.execute("""
+            SELECT company_id, due_date FROM treasury_outgoing WHERE due_date IS NOT NULL
+             UNION
+            SELECT company_id, due_date FROM treasury_incoming WHERE due_date IS NOT NULL
+        """)
+        self._refresh_periods(self.env.cr.fetchall())
@@ -0,0 +1,83 @@
+from odoo import api, fields, models, tools
+from odoo.addons.treasury.tools import check_pdf
+
+CHECK_FIELDS = [
+    ('due_date', 'Due Date'),
+    ('due_date_text', 'Due Date Text'),
+    ('amount_text', 'Amount Text'),
+    ('description', 'Description'),
+    ('amount', 'Amount')]
+
+
+class TreasuryCheckLayout(models.Model):
+    _name = "treasury.check.layout"
+    _description = "Check Layout"
+
+    name = fields.Char(string='Name', required=True)
+    width = fields.Float(string='Width (cm)', default=17, required=True)
+    font_family = fields.Char(string='Font Family', help='CSS font family of the printed fields.')
+    # a server path opened by reportlab, so only administrators may see or set it
+    font_path = fields.Char(string='Font File', groups='base.group_system',
+                            help='TrueType font used by native PDF printing, defaults to the '
+                                 'treasury.check_font_path system parameter.')
+    font_size = fields.Float(string='Font Size (pt)')
+    line_ids = fields.One2many(comodel_name='treasury.check.layout.line', inverse_name='layout_id',
+                               string='Fields', copy=True)
+
+    # compiled layouts are cached per layout; every change to a layout or its lines clears the cache
+    def write(self, vals):
+        res = super().write(vals)
+        self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
+
+    def _get_compiled(self):
+        """Return the layout as a check_pdf.CheckLayout, compiled once until a layout changes."""
+        self.ensure_one()
+        return self._compile(self.id)
+
+    @api.model
+    @tools.ormcache('layout_id')
+    def _compile(self, layout_id):
+        layout = self.sudo().browse(layout_id)
+        return check_pdf.CheckLayout(
+            width=layout.width,
+            font_family=layout.font_family or '',
+            font_path=layout.font_path or '',
+            font_size=layout.font_size,
+            fields=tuple(check_pdf.CheckField(line.field, line.right, line.top, line.fill)
+                         for line in layout.line_ids))
+
+
+class TreasuryCheckLayoutLine(models.Model):
+    _name = "treasury.check.layout.line"
+    _description = "Check Layout Field"
+    _order = 'sequence, id'
+
+    layout_id = fields.Many2one(comodel_name='treasury.check.layout', string='Layout', required=True,
+                                ondelete='cascade')
+    sequence = fields.Integer(string='Sequence', default=10)
+    field = fields.Selection(selection=CHECK_FIELDS, string='Field', required=True)
+    right = fields.Float(string='Right (cm)')
+    top = fields.Float(string='Top (cm)')
+    fill = fields.Boolean(string='Fill with stars')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.clear_caches()
+        return lines
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
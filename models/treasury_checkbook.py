@@ -1,3 +1,4 @@
+from collections import Counter, defaultdict
 from odoo import api, fields, models, _, exceptions
 
 
@@ -16,6 +17,11 @@ class TreasuryCheckbook(models.Model):
     last_serial_no = fields.Integer(string='Last Check Serial No.', compute='_compute_last_serial_no', store=True)
     series_no = fields.Integer(string='Series No.', required=True)
     remained = fields.Integer(string='# Remained', compute='_compute_remained_state', store=True)
+    # leaf counters per state bucket, moved by deltas as the leaves change and rebuilt by a daily job
+    leaf_count = fields.Integer(string='# Leaves', readonly=True, copy=False)
+    unused_count = fields.Integer(string='# Unused Leaves', readonly=True, copy=False)
+    closed_count = fields.Integer(string='# Closed Leaves', readonly=True, copy=False)
+    next_serial_no = fields.Integer(string='Next Check Serial No.', readonly=True, copy=False)
     next_check = fields.Char(string='next check No.', compute='_compute_next')
     display_name = fields.Char(string='Name', compute='_compute_display_name', store=True)
     active = fields.Boolean(string='active', compute='_compute_active', store=True)
@@ -34,26 +40,96 @@ class TreasuryCheckbook(models.Model):
         default='open',
         compute='_compute_remained_state',
         store=True)
+    _leaf_counters = ['leaf_count', 'unused_count', 'closed_count']
+    _unused_states = ('new', 'draft')
+    _closed_states = ('cashed', 'canceled')
 
-    @api.depends('first_serial_no')
+    @api.depends('first_serial_no', 'count')
     def _compute_last_serial_no(self):
         for check_book in self:
             check_book.last_serial_no = check_book.first_serial_no + check_book.count
 
-    @api.depends('check_ids.state')
+    @api.depends('leaf_count', 'unused_count', 'closed_count')
     def _compute_remained_state(self):
         for check_book in self:
-            if all(check.state in ('cashed', 'canceled') for check in check_book.check_ids):
+            if check_book.closed_count == check_book.leaf_count:
                 check_book.state = 'done'
                 check_book.remained = 0
             else:
-                check_book.remained = len(check_book.check_ids.filtered(lambda x: x.state in ('draft', 'new')))
+                check_book.remained = check_book.unused_count
                 check_book.state = 'open' if check_book.remained else 'finished'
 
+    @api.model
+    def _get_leaf_counter_deltas(self, checks):
+        """Return what the checks add to the leaf counters of their checkbooks, as {(checkbook_id, counter): n}."""
+        deltas = Counter()
+        for check in checks:
+            if not check.checkbook_id or check.type != 'check':
+                continue
+            deltas[check.checkbook_id.id, 'leaf_count'] += 1
+            if check.state in self._unused_states:
+                deltas[check.checkbook_id.id, 'unused_count'] += 1
+            elif check.state in self._closed_states:
+                deltas[check.checkbook_id.id, 'closed_count'] += 1
+        return deltas
+
+    @api.model
+    def _update_leaf_counters(self, deltas):
+        """Add deltas, as returned by _get_leaf_counter_deltas, to the leaf counters in place."""
+        deltas_by_book = defaultdict(dict)
+        for (check_book_id, counter), delta in deltas.items():
+            if delta:
+                deltas_by_book[check_book_id][counter] = delta
+        if not deltas_by_book:
+            return
+        for check_book_id, book_deltas in deltas_by_book.items():
+            self.env.cr.execute(
+                'UPDATE treasury_checkbook SET {} WHERE id = %s'.format(
+                    ', '.join('{0} = COALESCE({0}, 0) + %s'.format(counter) for counter in book_deltas)),
+                list(book_deltas.values()) + [check_book_id])
+        check_books = self.browse(list(deltas_by_book))
+        check_books.invalidate_cache(self._leaf_counters, check_books.ids)
+        check_books.modified(self._leaf_counters)
+
+    @api.model
+    def _reconcile_leaf_counters(self):
+        """Rebuild the leaf counters from the leaves and return the ids of the checkbooks they were off for."""
+        self.env['treasury.outgoing'].flush(['state', 'type', 'checkbook_id'])
+        self.env.cr.execute("""
+            WITH leaf AS (
+                SELECT book.id,
+                       count(check_leaf.id) AS leaf_count,
+                       count(check_leaf.id) FILTER (WHERE check_leaf.state IN %(unused)s) AS unused_count,
+                       count(check_leaf.id) FILTER (WHERE check_leaf.state IN %(closed)s) AS closed_count
+                  FROM treasury_checkbook book
+             LEFT JOIN treasury_outgoing check_leaf
+                    ON check_leaf.checkbook_id = book.id AND check_leaf.type = 'check'
+              GROUP BY book.id
+            )
+            UPDATE treasury_checkbook book
+               SET leaf_count = leaf.leaf_count, unused_count = leaf.unused_count, closed_count = leaf.closed_count
+              FROM leaf
+             WHERE leaf.id = book.id
+               AND (book.leaf_count, book.unused_count, book.closed_count)
+                   IS DISTINCT FROM (leaf.leaf_count, leaf.unused_count, leaf.closed_count)
+         RETURNING book.id
+        """, {'unused': self._unused_states, 'closed': self._closed_states})
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _cron_reconcile_leaf_counters(self):
+        check_books = self.with_context(active_test=False).browse(self._reconcile_leaf_counters())
+        check_books.invalidate_cache(self._leaf_counters, check_books.ids)
+        check_books.modified(self._leaf_counters)
+        check_books.flush()
+
+    @api.depends('series_no', 'first_serial_no', 'count', 'next_serial_no')
     def _compute_next(self):
         for check_book in self:
-            check_book.next_check = self.env['treasury.outgoing'].search(
-                [('state', '=', 'new'), ('type', '=', 'check')], limit=1).get_name()  # todo: Make sure it works!
+            if check_book.first_serial_no <= check_book.next_serial_no < check_book.first_serial_no + check_book.count:
+                check_book.next_check = '{}/{}'.format(check_book.series_no, check_book.next_serial_no)
+            else:
+                check_book.next_check = False
 
     @api.depends('journal_id.name', 'first_serial_no', 'count')
     def _compute_display_name(self):
@@ -78,16 +154,92 @@ class TreasuryCheckbook(models.Model):
         except Exception as e:
             print(e)
 
-    @api.model
-    def create(self, vals):
-        check_book = super(TreasuryCheckbook, self).create(vals)
-        for n in range(check_book.count):
-            self.env['treasury.outgoing'].create({
-                'number': '{}/{}'.format(check_book.series_no, int(check_book.first_serial_no) + n),
-                'checkbook_id': check_book.id,
-                'type': 'check'
-            })
-        return check_book
+    def init(self):
+        # checkbooks registered before the leaf counters and the cursor existed
+        self.env.cr.execute("SELECT 1 FROM treasury_checkbook WHERE leaf_count IS NULL LIMIT 1")
+        if self.env.cr.fetchone():
+            self._reconcile_leaf_counters()
+        self.env.cr.execute("""
+            UPDATE treasury_checkbook SET next_serial_no = first_serial_no WHERE next_serial_no IS NULL
+            RETURNING id
+        """)
+        check_book_ids = [row[0] for row in self.env.cr.fetchall()]
+        if check_book_ids:
+            self.browse(check_book_ids)._advance_next_serial()
+
+    def _lock_next_serial(self):
+        """Lock the checkbook rows, in id order so concurrent cashiers queue instead of deadlocking."""
+        self.env.cr.execute("""
+            SELECT id FROM treasury_checkbook WHERE id IN %s ORDER BY id FOR UPDATE
+        """, (tuple(self.ids),))
+
+    def _advance_next_serial(self, rewind=False):
+        """Move the cursor of the checkbooks to their first leaf still in new state.
+
+        The search starts at the current cursor, or at the first leaf with ``rewind``, and probes the leaves
+        serial by serial through the (number, type) unique index, so it reads at most the rest of the book.
+        """
+        if not self:
+            return
+        self.env['treasury.outgoing'].flush(['number', 'type', 'state', 'checkbook_id'])
+        self.flush(['series_no', 'first_serial_no', 'count', 'next_serial_no'])
+        self._lock_next_serial()
+        self.env.cr.execute("""
+            UPDATE treasury_checkbook book
+               SET next_serial_no = COALESCE((
+                       SELECT min(leaf.serial_no)
+                         FROM generate_series(CASE WHEN %(rewind)s THEN book.first_serial_no
+                                                   ELSE GREATEST(book.next_serial_no, book.first_serial_no) END,
+                                              book.first_serial_no + book.count - 1) AS leaf(serial_no)
+                         JOIN treasury_outgoing check_leaf
+                           ON check_leaf.number = book.series_no::text || '/' || leaf.serial_no::text
+                          AND check_leaf.type = 'check'
+                        WHERE check_leaf.checkbook_id = book.id AND check_leaf.state = 'new'
+                   ), book.first_serial_no + book.count)
+             WHERE book.id IN %(ids)s
+        """, {'rewind': rewind, 'ids': tuple(self.ids)})
+        self.invalidate_cache(['next_serial_no', 'next_check'], self.ids)
+
+    def _take_next_checks(self, count=1):
+        """Hand out the next ``count`` new leaves of the checkbook, in serial order, as draft checks.
+
+        The checkbook row stays locked until the transaction ends, so concurrent cashiers get distinct
+        consecutive leaves.
+        """
+        self.ensure_one()
+        self._lock_next_serial()
+        self.env['treasury.outgoing'].flush(['number', 'type', 'state', 'checkbook_id'])
+        self.invalidate_cache(['next_serial_no'], self.ids)
+        serial_nos = {'{}/{}'.format(self.series_no, serial_no): serial_no for serial_no in
+                      range(self.next_serial_no, self.first_serial_no + self.count)}
+        checks = self.env['treasury.outgoing'].search(
+            [('number', 'in', list(serial_nos)), ('type', '=', 'check'), ('checkbook_id', '=', self.id),
+             ('state', '=', 'new')])
+        checks = checks.sorted(lambda check: serial_nos[check.number])[:count]
+        checks.write({'state': 'draft'})
+        return checks
+
+    def action_next_check(self):
+        check = self._take_next_checks()
+        if not check:
+            raise exceptions.UserError(_('There is no new check left in this checkbook.'))
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'treasury.outgoing',
+            'res_id': check.id,
+            'view_mode': 'form',
+        }
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        vals_list = [dict(vals, next_serial_no=vals.get('first_serial_no', 0)) for vals in vals_list]
+        check_books = super(TreasuryCheckbook, self).create(vals_list)
+        self.env['treasury.outgoing'].with_context(mail_create_nolog=True, mail_create_nosubscribe=True).create([{
+            'number': '{}/{}'.format(check_book.series_no, int(check_book.first_serial_no) + n),
+            'checkbook_id': check_book.id,
+            'type': 'check'
+        } for check_book in check_books for n in range(check_book.count)])
+        return check_books
 
     @api.model
     def unlink(self):
@@ -1,4 +1,5 @@
 import datetime
+from collections import defaultdict
 from odoo import api, fields, models, _
 
 
@@ -9,7 +10,7 @@ class TreasuryEntry(models.AbstractModel):
 
     name = fields.Char(string='Internal Number ', copy=False, readonly=True, index=True)
     number = fields.Char(string='Number', required=True)
-    due_date = fields.Date(string='Due Date')
+    due_date = fields.Date(string='Due Date', index=True)
     amount = fields.Monetary(currency_field='currency_id', string='Amount')
     currency_id = fields.Many2one('res.currency', string='currency',
                                   default=lambda self: self.env['res.company']._company_default_get().currency_id)
@@ -24,7 +25,8 @@ class TreasuryEntry(models.AbstractModel):
         ('due', 'Due'),
         ('overdue', 'overdue')],
         compute='_compute_due',
-        search='_search_due')
+        store=True,
+        index=True)
     type = fields.Selection(selection=[
         ('check', 'Check'),
         ('promissory_note', 'Promissory note'),
@@ -32,6 +34,8 @@ class TreasuryEntry(models.AbstractModel):
         ('lc', 'LC'),
         ('bank_guaranty', 'Bank_guaranty')],
         required=True)
+    # fields the cash flow forecast depends on
+    _forecast_fields = {'state', 'amount', 'due_date', 'guaranty', 'company_id', 'currency_id'}
     _sql_constraints = [('unique_type_name', 'unique(number, type)',
                          'This name is duplicate!')]
 
@@ -58,33 +62,89 @@ class TreasuryEntry(models.AbstractModel):
             self.guaranty = True
         return {'domain': {'security_type_id': [('type', '=', self.type)]}}
 
-    def _search_due(self, operator, value):
-        current_date = datetime.date.today()
-        if operator == '=':
-            if value == 'overdue':
-                return [('due_date', '<', current_date)]
-            elif value == 'due':
-                return [('due_date', '=', current_date)]
-            elif value == 'undue':
-                return [('due_date', '>', current_date)]
-            else:
-                return [('due_date', '=', False)]
-        elif operator == '!=':
-            if value == 'overdue':
-                return [('due_date', '>=', current_date)]
-            elif value == 'due':
-                return ['|', ('due_date', '<', current_date), ('due_date', '>', current_date)]
-            elif value == 'undue':
-                return [('due_date', '<=', current_date)]
-            else:
-                return [('due_date', '=', False)]
-        else:
-            raise NotImplementedError
+    @api.model
+    def _cron_refresh_due_state(self):
+        """Refresh the stored due_state of the rows whose due date was crossed since the previous run.
+
+        Only rows with a due date between the last refresh date and today can have changed state, so the
+        update is a range scan on the due_date index. The first run refreshes every row.
+        """
+        param_key = '%s.due_state_date' % self._name
+        config_parameter = self.env['ir.config_parameter'].sudo()
+        today = fields.Date.today()
+        last_refresh = config_parameter.get_param(param_key)
+        self.flush(['due_date', 'due_state'])
+
+        query = """
+            UPDATE {table}
+               SET due_state = CASE WHEN due_date < %(today)s THEN 'overdue'
+                                    WHEN due_date = %(today)s THEN 'due'
+                                    ELSE 'undue' END
+             WHERE due_date <= %(today)s
+        """.format(table=self._table)
+        if last_refresh:
+            query += " AND due_date >= %(last_refresh)s"
+        self.env.cr.execute(query, {
+            'today': today,
+            'last_refresh': last_refresh,
+        })
+        self.invalidate_cache(['due_state'])
+        config_parameter.set_param(param_key, fields.Date.to_string(today))
 
     @api.model
-    def create(self, vals):
-        if not vals.get('guaranty') and vals['type'] in ['bank_guaranty', 'promissory_note']:
-            vals['guaranty'] = True
+    def _reserve_names(self, count):
+        """Reserve ``count`` internal numbers from the model sequence in a single round trip."""
+        sequence = self.env['ir.sequence'].sudo().search(
+            [('code', '=', self._name), ('company_id', 'in', [self.env.company.id, False])],
+            order='company_id', limit=1)
+        if not sequence or sequence.use_date_range:
+            return [self.env['ir.sequence'].next_by_code(self._name) for n in range(count)]
+
+        if sequence.implementation == 'standard':
+            self.env.cr.execute("SELECT nextval('ir_sequence_%03d') FROM generate_series(1, %%s)" % sequence.id,
+                                (count,))
+            numbers = [row[0] for row in self.env.cr.fetchall()]
+        else:
+            self.env.cr.execute("SELECT number_next FROM ir_sequence WHERE id=%s FOR UPDATE NOWAIT", (sequence.id,))
+            number_next = self.env.cr.fetchone()[0]
+            self.env.cr.execute("UPDATE ir_sequence SET number_next=number_next+%s WHERE id=%s",
+                                (sequence.number_increment * count, sequence.id))
+            sequence.invalidate_cache(['number_next'], sequence.ids)
+            numbers = range(number_next, number_next + sequence.number_increment * count, sequence.number_increment)
+        return [sequence.get_next_char(number) for number in numbers]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        vals_list = [dict(vals) for vals in vals_list]
+        vals_by_company = defaultdict(list)
+        for vals in vals_list:
+            if not vals.get('guaranty') and vals['type'] in ['bank_guaranty', 'promissory_note']:
+                vals['guaranty'] = True
+            vals_by_company[vals.get('company_id') or self.env.company.id].append(vals)
+
+        # one sequence block per company, so imports spanning companies still use each company's sequence
+        for company_id, company_vals_list in vals_by_company.items():
+            names = self.with_company(company_id)._reserve_names(len(company_vals_list))
+            for vals, name in zip(company_vals_list, names):
+                vals['name'] = name
+        docs = super().create(vals_list)
+        self.env['treasury.cash.forecast']._refresh_periods(docs._get_forecast_keys())
+        return docs
+
+    def write(self, vals):
+        if not self._forecast_fields.intersection(vals):
+            return super().write(vals)
+        forecast_keys = self._get_forecast_keys()
+        res = super().write(vals)
+        self.env['treasury.cash.forecast']._refresh_periods(forecast_keys | self._get_forecast_keys())
+        return res
+
+    def unlink(self):
+        forecast_keys = self._get_forecast_keys()
+        res = super().unlink()
+        self.env['treasury.cash.forecast']._refresh_periods(forecast_keys)
+        return res
 
-        vals['name'] = self.env['ir.sequence'].next_by_code(self._name)
-        return super().create(vals)
+    def _get_forecast_keys(self):
+        """Return the (company_id, due_date) pairs the cash flow forecast keeps for these documents."""
+        return {(doc.company_id.id, doc.due_date) for doc in self if doc.due_date}
@@ -1,4 +1,4 @@
-from odoo import api, fields, models, _
+from odoo import api, fields, models, _, exceptions
 
 
 class TreasuryIncoming(models.Model):
@@ -30,6 +30,52 @@ class TreasuryIncoming(models.Model):
         tracking=True,
         default='draft')
 
+    # from: allowed source states, to: target state, debit/credit: account resolvers taking the document,
+    # skip_guaranty: guaranty documents change state without a journal entry
+    _transitions = {
+        'confirm': {
+            'from': ('draft',),
+            'to': 'undeposited',
+            'label': 'Receiving',
+            'debit': lambda doc: doc.company_id.incoming_securities_account_id,
+            'credit': lambda doc: doc.consignee_id.property_account_receivable_id,
+            'skip_guaranty': True,
+        },
+        'in_bank': {
+            'from': ('undeposited', 'bounced', 'sued'),
+            'to': 'in_bank',
+            'label': 'Delivering',
+            'debit': lambda doc: doc.company_id.incoming_securities_in_bank_account_id,
+            'credit': lambda doc: doc.company_id.incoming_securities_account_id if doc.guaranty
+            else doc.company_id.other_incomes_account,
+            'skip_guaranty': False,
+        },
+        'bounce': {
+            'from': ('undeposited', 'in_bank'),
+            'to': 'bounced',
+            'label': 'Bouncing',
+            'debit': lambda doc: doc.consignee_id.property_account_receivable_id,
+            'credit': lambda doc: doc.company_id.incoming_securities_in_bank_account_id,
+            'skip_guaranty': False,
+        },
+        'sue': {
+            'from': ('bounced',),
+            'to': 'sued',
+            'label': 'Suing',
+            'debit': lambda doc: doc.company_id.incoming_securities_account_id,
+            'credit': lambda doc: doc.company_id.sued_incoming_securities_account_id,
+            'skip_guaranty': True,
+        },
+        'return': {
+            'from': ('draft', 'undeposited', 'in_bank', 'collected', 'transferred', 'bounced', 'sued'),
+            'to': 'returned',
+            'label': 'Returning',
+            'debit': lambda doc: doc.consignee_id.property_account_receivable_id,
+            'credit': lambda doc: doc.company_id.incoming_securities_account_id,
+            'skip_guaranty': True,
+        },
+    }
+
     @api.depends('state')
     def _compute_active(self):
         for doc in self:
@@ -44,132 +90,72 @@ class TreasuryIncoming(models.Model):
     def _onchange_consignee_id(self):
         self.issued_by = self.consignee_id.display_name
 
+    def _prepare_move_vals(self, label, debit_account, credit_account):
+        self.ensure_one()
+        name_and_ref = '{} {} {} for {}'.format(label, self.security_type_id.name, self.number,
+                                                self.env.context.get('payment_description') or self.reason)
+        debit_line_vals = {
+            'name': name_and_ref,
+            'debit': self.amount,
+            'account_id': debit_account.id,
+            'treasury_incoming_id': self.id,
+        }
+        credit_line_vals = {
+            'name': name_and_ref,
+            'credit': self.amount,
+            'account_id': credit_account.id,
+            'treasury_incoming_id': self.id,
+        }
+        return {
+            'journal_id': self.company_id.treasury_journal_id.id,
+            'partner_id': self.consignee_id.id,
+            'line_ids': [(0, 0, debit_line_vals), (0, 0, credit_line_vals)],
+            'ref': name_and_ref,
+        }
+
+    @api.model
+    def _create_account_moves(self, move_vals_by_doc):
+        """Create the journal entries of many documents with a single account.move create.
+
+        Move lines carry their document in ``treasury_incoming_id``, so they are linked on creation.
+
+        :param dict move_vals_by_doc: account.move values keyed by treasury.incoming record
+        :return: dict mapping each document to its new account.move
+        """
+        if not move_vals_by_doc:
+            return {}
+        docs = list(move_vals_by_doc)
+        moves = self.env['account.move'].create([move_vals_by_doc[doc] for doc in docs])
+        return dict(zip(docs, moves))
+
+    def _apply_transition(self, transition_name):
+        """Move the documents along ``transition_name`` of ``_transitions`` and post their journal entries.
+
+        :return: dict mapping each document that got a journal entry to its account.move
+        """
+        transition = self._transitions[transition_name]
+        invalid_docs = self.filtered(lambda doc: doc.state not in transition['from'])
+        if invalid_docs:
+            raise exceptions.UserError(_('%s is not allowed for documents in state %s: %s') % (
+                transition['label'], ', '.join(sorted(set(invalid_docs.mapped('state')))),
+                ', '.join(invalid_docs.mapped('number'))))
+
+        self.write({'state': transition['to']})
+        return self._create_account_moves({
+            doc: doc._prepare_move_vals(transition['label'], transition['debit'](doc), transition['credit'](doc))
+            for doc in self if not (transition['skip_guaranty'] and doc.guaranty)})
+
     def action_confirm(self):
-        for doc in self:
-            doc.state = 'undeposited'
-            if not doc.guaranty:
-                name_and_ref = 'Receiving {} {} for {}'.format(doc.security_type_id.name, doc.number,
-                                                               doc.env.context.get('payment_description') or doc.reason)
-                debit_line_vals = {
-                    'name': name_and_ref,
-                    'debit': doc.amount,
-                    'account_id': doc.company_id.incoming_securities_account_id.id,
-                }
-                credit_line_vals = {
-                    'name': name_and_ref,
-                    'credit': doc.amount,
-                    'account_id': doc.consignee_id.property_account_receivable_id.id,
-                }
-
-                vals = {
-                    'journal_id': doc.company_id.treasury_journal_id.id,
-                    'partner_id': doc.consignee_id.id,
-                    'line_ids': [(0, 0, debit_line_vals), (0, 0, credit_line_vals)],
-                    'ref': name_and_ref
-                }
-                new_move = doc.env['account.move'].create(vals)
-                doc.account_move_line_ids += new_move.line_ids
+        self._apply_transition('confirm')
 
     def action_in_bank(self):
-        for doc in self:
-            doc.state = 'in_bank'
-            credit_account = doc.company_id.incoming_securities_account_id.id if doc.guaranty \
-                else doc.company_id.other_incomes_account.id
-            name_and_ref = 'Delivering {} {} for {}'.format(doc.security_type_id.name, doc.number,
-                                                            doc.env.context.get('payment_description') or doc.reason)
-            debit_line_vals = {
-                'name': name_and_ref,
-                'debit': doc.amount,
-                'account_id': doc.company_id.incoming_securities_in_bank_account_id.id,
-            }
-            credit_line_vals = {
-                'name': name_and_ref,
-                'credit': doc.amount,
-                'account_id': credit_account,
-            }
-
-            vals = {
-                'journal_id': doc.company_id.treasury_journal_id.id,
-                'partner_id': doc.consignee_id.id,
-                'line_ids': [(0, 0, debit_line_vals), (0, 0, credit_line_vals)],
-                'ref': name_and_ref,
-            }
-            new_move = doc.env['account.move'].create(vals)
-            doc.account_move_line_ids += new_move.line_ids
+        self._apply_transition('in_bank')
 
     def action_bounce(self):
-        for doc in self:
-            self.state = 'bounced'
-            name_and_ref = 'Bouncing {} {} for {}'.format(doc.security_type_id.name, doc.number,
-                                                          doc.env.context.get('payment_description') or doc.reason)
-            debit_line_vals = {
-                'name': name_and_ref,
-                'debit': doc.amount,
-                'account_id': doc.consignee_id.property_account_receivable_id.id,
-            }
-            credit_line_vals = {
-                'name': name_and_ref,
-                'credit': doc.amount,
-                'account_id': doc.company_id.incoming_securities_in_bank_account_id.id,
-            }
-
-            vals = {
-                'journal_id': doc.company_id.treasury_journal_id.id,
-                'partner_id': doc.consignee_id.id,
-                'line_ids': [(0, 0, debit_line_vals), (0, 0, credit_line_vals)],
-                'ref': name_and_ref,
-            }
-            new_move = doc.env['account.move'].create(vals)
-            doc.account_move_line_ids += new_move.line_ids
+        self._apply_transition('bounce')
 
     def action_sue(self):
-        for doc in self:
-            doc.state = 'sued'
-            if not doc.guaranty:
-                name_and_ref = 'Suing {} {} for {}'.format(doc.security_type_id.name, doc.number,
-                                                           doc.env.context.get('payment_description') or doc.reason)
-                debit_line_vals = {
-                    'name': name_and_ref,
-                    'debit': doc.amount,
-                    'account_id': doc.company_id.incoming_securities_account_id.id,
-                }
-                credit_line_vals = {
-                    'name': name_and_ref,
-                    'credit': doc.amount,
-                    'account_id': doc.company_id.sued_incoming_securities_account_id.id,
-                }
-
-                vals = {
-                    'journal_id': doc.company_id.treasury_journal_id.id,
-                    'partner_id': doc.consignee_id.id,
-                    'line_ids': [(0, 0, debit_line_vals), (0, 0, credit_line_vals)],
-                    'ref': name_and_ref,
-                }
-                new_move = doc.env['account.move'].create(vals)
-                doc.account_move_line_ids += new_move.line_ids
+        self._apply_transition('sue')
 
     def action_return(self):
-        for doc in self:
-            doc.state = 'returned'
-            if not doc.guaranty:
-                name_and_ref = 'Returning {} {} for {}'.format(doc.security_type_id.name, doc.number,
-                                                               doc.env.context.get('payment_description') or doc.reason)
-                debit_line_vals = {
-                    'name': name_and_ref,
-                    'debit': doc.amount,
-                    'account_id': doc.consignee_id.property_account_receivable_id.id,
-                }
-                credit_line_vals = {
-                    'name': name_and_ref,
-                    'credit': doc.amount,
-                    'account_id': doc.company_id.incoming_securities_account_id.id,
-                }
-
-                vals = {
-                    'journal_id': doc.company_id.treasury_journal_id.id,
-                    'partner_id': doc.consignee_id.id,
-                    'line_ids': [(0, 0, debit_line_vals), (0, 0, credit_line_vals)],
-                    'ref': name_and_ref,
-                }
-                new_move = doc.env['account.move'].create(vals)
-                doc.account_move_line_ids += new_move.line_ids
+        self._apply_transition('return')
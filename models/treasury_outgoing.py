@@ -1,6 +1,10 @@
-from odoo import api, fields, models, _
-from odoo.addons.treasury.tools.num2fawords import ordinal_words, words
+import os
+from collections import defaultdict
+from odoo import api, fields, models, _, exceptions
+from odoo.addons.treasury.tools.num2fawords import currency_words_many, ordinal_words, words
 from odoo.addons.treasury.tools import jadatetime as jd
+from odoo.addons.treasury.tools import check_pdf
+from odoo.tools.misc import format_date
 
 
 class TreasuryOutgoing(models.Model):
@@ -43,19 +47,32 @@ class TreasuryOutgoing(models.Model):
     def name_get(self):
         return '{}_{}'.format(self.checkbook_id.journal_id.name, self.number)
 
+    @api.depends('due_date')
     def _compute_due_date_text(self):
+        # one Jalali conversion per distinct due date of the batch
+        due_date_texts = {False: False}
         for doc in self:
-            doc.due_date_text = ordinal_words(jd.date.fromgregorian(date=self.due_date).day) \
-                                + jd.date.fromgregorian(date=self.due_date).aslocale('fa_IR').strftime(' %B ') \
-                                + words(jd.date.fromgregorian(date=self.due_date).year)
+            if doc.due_date not in due_date_texts:
+                jdate = jd.date.fromgregorian(date=doc.due_date, locale='fa_IR')
+                due_date_texts[doc.due_date] = ordinal_words(jdate.day) + jdate.strftime(' %B ') + words(jdate.year)
+            doc.due_date_text = due_date_texts[doc.due_date]
 
+    @api.depends('amount', 'currency_id.rounding')
     def _compute_amount_text(self):
+        # one words_many pass per currency precision over the amounts of the batch
+        docs_by_rounding = defaultdict(list)
         for doc in self:
-            doc.amount_text = words(self.amount)
+            docs_by_rounding[doc.currency_id.rounding or 1.0].append(doc)
+        for rounding, docs in docs_by_rounding.items():
+            amount_texts = currency_words_many([doc.amount for doc in docs], rounding)
+            for doc, amount_text in zip(docs, amount_texts):
+                doc.amount_text = amount_text
 
+    @api.depends('beneficiary_id.name', 'reason')
     def _compute_description(self):
+        label = _('for')
         for doc in self:
-            doc.description = '{} {} {}'.format(self.beneficiary_id.name, _('for'), self.reason)
+            doc.description = '{} {} {}'.format(doc.beneficiary_id.name, label, doc.reason)
 
     @api.depends('type')
     def _compute_select_type(self):
@@ -77,10 +94,95 @@ class TreasuryOutgoing(models.Model):
         for doc in self:
             doc.type = doc.select_type
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        docs = super().create(vals_list)
+        checkbook_model = self.env['treasury.checkbook']
+        checkbook_model._update_leaf_counters(checkbook_model._get_leaf_counter_deltas(docs))
+        return docs
+
+    def write(self, vals):
+        if not {'state', 'type', 'checkbook_id', 'number'}.intersection(vals):
+            return super().write(vals)
+        checkbook_model = self.env['treasury.checkbook']
+        previous_counts = checkbook_model._get_leaf_counter_deltas(self)
+        # leaves leaving or coming back to new move the next check cursor of their checkbook; leaves moved to
+        # another checkbook or serial send the cursors of both books back to their first new leaf
+        rewind = vals.get('state') == 'new' or bool({'type', 'checkbook_id', 'number'}.intersection(vals))
+        if rewind:
+            checkbooks = self.mapped('checkbook_id')
+        else:
+            checkbooks = self.filtered(lambda doc: doc.state == 'new').mapped('checkbook_id')
+        res = super().write(vals)
+        counter_deltas = checkbook_model._get_leaf_counter_deltas(self)
+        counter_deltas.subtract(previous_counts)
+        checkbook_model._update_leaf_counters(counter_deltas)
+        if rewind:
+            checkbooks |= self.mapped('checkbook_id')
+        if checkbooks:
+            checkbooks._advance_next_serial(rewind=rewind)
+        return res
+
+    def unlink(self):
+        counter_deltas = self.env['treasury.checkbook']._get_leaf_counter_deltas(self)
+        res = super().unlink()
+        self.env['treasury.checkbook']._update_leaf_counters({key: -delta for key, delta in counter_deltas.items()})
+        return res
+
     def action_print(self):
         self.state = 'issued'
         return self.env.ref('treasury.action_print_check').report_action(self, config=False)
 
+    def action_print_bulk(self):
+        """Print a run of cheques as one lean PDF and issue them with a single write."""
+        checks = self.filtered(lambda doc: doc.type == 'check' and doc.state in ('new', 'draft'))
+        if not checks:
+            raise exceptions.UserError(_('Only new or draft checks can be printed.'))
+        if checks != self:
+            raise exceptions.UserError(_('Only new or draft checks can be printed, these cannot:\n%s')
+                                       % '\n'.join((self - checks).mapped('display_name')))
+        # prefetch and compute the printed fields for the whole run at once
+        checks.read(['due_date', 'due_date_text', 'amount', 'amount_text', 'description'])
+        checks.write({'state': 'issued'})
+        return self.env.ref('treasury.action_print_check_bulk').report_action(checks, config=False)
+
+    def _get_check_layout(self):
+        """Return the compiled check_pdf.CheckLayout of the check's bank journal."""
+        self.ensure_one()
+        layout = self.checkbook_id.journal_id.check_layout_id or \
+            self.env.ref('treasury.check_layout_default', raise_if_not_found=False)
+        return layout._get_compiled() if layout else check_pdf.DEFAULT_LAYOUT
+
+    def _get_check_values(self):
+        """Return the printed text of each check field."""
+        self.ensure_one()
+        return {
+            # printed in Persian whoever prints, as the report template does
+            'due_date': format_date(self.env, self.due_date, lang_code='fa_IR') if self.due_date else '',
+            'due_date_text': self.due_date_text or '',
+            'amount_text': self.amount_text or '',
+            'description': self.description or '',
+            'amount': '--/{}/--'.format(self.amount),
+        }
+
+    def _render_check_pdf(self):
+        """Draw the checks into one PDF without wkhtmltopdf, at the positions of their check layouts."""
+        default_font_path = self.env['ir.config_parameter'].sudo().get_param('treasury.check_font_path',
+                                                                              check_pdf.DEFAULT_FONT_PATH)
+        self.read(['due_date', 'due_date_text', 'amount', 'amount_text', 'description'])
+        checks = []
+        for doc in self:
+            layout = doc._get_check_layout()
+            if not layout.font_path:
+                layout = layout._replace(font_path=default_font_path)
+            checks.append((layout, doc._get_check_values()))
+        for font_path in {layout.font_path for layout, values in checks}:
+            if not os.path.isfile(font_path):
+                raise exceptions.UserError(_('Native check printing needs a TrueType font with Persian glyphs, '
+                                             'set its path on the check layout or in the '
+                                             'treasury.check_font_path system parameter.'))
+        return check_pdf.render_checks(checks)
+
     def action_issue(self):
         self.state = 'issued'
 
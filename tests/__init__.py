@@ -1,2 +1,7 @@
 from . import test_register_checkbook
 from . import test_incoming_account_moves
+from . import test_due_state
+from . import test_reports
+from . import test_jadatetime
+from . import test_num2fawords
+from . import test_outgoing
@@ -0,0 +1,43 @@
+from odoo.tests.common import TransactionCase, tagged
+from datetime import date, timedelta
+
+
+@tagged('-at_install', 'post_install')
+class TestDueState(TransactionCase):
+    def setUp(self):
+        super(TestDueState, self).setUp()
+        self.today = date.today()
+        self.doc = self.env['treasury.incoming'].create({
+            'number': 'due_state_test',
+            'type': 'check',
+            'received_date': self.today,
+            'due_date': self.today + timedelta(days=1),
+            'amount': 1000,
+            'consignee_id': 1,
+            'issued_by': 'Issuer'
+        })
+
+    def test_due_state_computed(self):
+        """
+        due state should be stored according to the due date
+        """
+        self.assertEqual(self.doc.due_state, 'undue')
+        self.doc.due_date = self.today
+        self.assertEqual(self.doc.due_state, 'due')
+        self.doc.due_date = self.today - timedelta(days=1)
+        self.assertEqual(self.doc.due_state, 'overdue')
+        self.assertIn(self.doc, self.env['treasury.incoming'].search([('due_state', '=', 'overdue')]))
+
+    def test_due_state_refresh(self):
+        """
+        the refresh job should update rows whose due date has been crossed
+        """
+        self.doc.flush()
+        self.env.cr.execute("UPDATE treasury_incoming SET due_date = %s WHERE id = %s",
+                            (self.today - timedelta(days=1), self.doc.id))
+        self.env['ir.config_parameter'].sudo().set_param('treasury.incoming.due_state_date',
+                                                         str(self.today - timedelta(days=2)))
+        self.env['treasury.incoming']._cron_refresh_due_state()
+        self.assertEqual(self.doc.due_state, 'overdue')
+        groups = self.env['treasury.incoming'].read_group([('id', '=', self.doc.id)], ['due_state'], ['due_state'])
+        self.assertEqual([group['due_state'] for group in groups], ['overdue'])
@@ -1,4 +1,5 @@
 from odoo.tests.common import TransactionCase, tagged
+from odoo.exceptions import UserError
 from datetime import date
 
 
@@ -67,6 +68,7 @@ class TestIncomingAccountMove(TransactionCase):
         """
         Check in_bank action
         """
+        (self.promissory_test | self.check_test1 | self.check_test2).write({'state': 'undeposited'})
 
         self.promissory_test.action_in_bank()
         self.assertEqual(self.promissory_test.state, 'in_bank')
@@ -93,6 +95,7 @@ class TestIncomingAccountMove(TransactionCase):
         """
         Check bounce action
         """
+        (self.promissory_test | self.check_test1 | self.check_test2).write({'state': 'undeposited'})
 
         self.promissory_test.action_bounce()
         self.assertEqual(self.promissory_test.state, 'bounced')
@@ -119,6 +122,7 @@ class TestIncomingAccountMove(TransactionCase):
         """
         Check sue action
         """
+        (self.promissory_test | self.check_test1 | self.check_test2).write({'state': 'bounced'})
 
         self.promissory_test.action_sue()
         self.assertEqual(self.promissory_test.state, 'sued')
@@ -139,6 +143,7 @@ class TestIncomingAccountMove(TransactionCase):
         """
         Check sue action
         """
+        (self.promissory_test | self.check_test1 | self.check_test2).write({'state': 'bounced'})
 
         self.promissory_test.action_return()
         self.assertEqual(self.promissory_test.state, 'returned')
@@ -154,3 +159,57 @@ class TestIncomingAccountMove(TransactionCase):
         self.assertEqual(self.check_test2.account_move_line_ids[0].move_id, self.check_test2.account_move_ids)
         self.assertEqual(sum(ml.debit for ml in self.check_test2.account_move_line_ids),
                          sum(ml.credit for ml in self.check_test2.account_move_line_ids))
+
+    def test_confirm_many_account_moves(self):
+        """
+        Check confirm action on several documents at once
+        """
+        docs = self.promissory_test | self.check_test1 | self.check_test2
+        docs.action_confirm()
+        self.assertEqual(set(docs.mapped('state')), {'undeposited'})
+        self.assertEqual(len(docs.mapped('account_move_line_ids')), 2)
+        self.assertEqual(len(docs.mapped('account_move_ids')), 1)
+
+        docs.action_in_bank()
+        self.assertEqual(len(docs.mapped('account_move_ids')), 4)
+        for doc in docs:
+            self.assertEqual(sum(ml.debit for ml in doc.account_move_line_ids),
+                             sum(ml.credit for ml in doc.account_move_line_ids))
+
+    def test_invalid_transition(self):
+        """
+        Check actions are refused from states they do not apply to
+        """
+        with self.assertRaises(UserError):
+            self.check_test2.action_sue()
+        self.assertEqual(self.check_test2.state, 'draft')
+        self.assertEqual(len(self.check_test2.account_move_line_ids), 0)
+
+    def test_create_account_moves_mapping(self):
+        """
+        Check the move engine returns the move of every document
+        """
+        docs = self.check_test1 | self.check_test2
+        move_by_doc = self.env['treasury.incoming']._create_account_moves({
+            doc: doc._prepare_move_vals('Testing', doc.company_id.incoming_securities_account_id,
+                                        doc.consignee_id.property_account_receivable_id)
+            for doc in docs})
+        self.assertEqual(set(move_by_doc), set(docs))
+        for doc, move in move_by_doc.items():
+            self.assertEqual(doc.account_move_ids, move)
+
+    def test_bulk_create(self):
+        """
+        Check creating many securities in one call
+        """
+        securities = self.env['treasury.incoming'].create([{
+            'number': 'bulk_test_{}'.format(n),
+            'type': 'promissory_note' if n % 2 else 'check',
+            'received_date': date(2020, 6, 1),
+            'amount': 1000 * n,
+            'consignee_id': 1,
+            'issued_by': 'Issuer'
+        } for n in range(20)])
+        self.assertEqual(len(set(securities.mapped('name'))), 20)
+        self.assertTrue(all(doc.guaranty for doc in securities if doc.type == 'promissory_note'))
+        self.assertFalse(any(doc.guaranty for doc in securities if doc.type == 'check'))
@@ -0,0 +1,238 @@
+from odoo.tests.common import TransactionCase, tagged
+import datetime
+import asyncio
+import pickle
+import threading
+import timeit
+import tracemalloc
+import unittest
+from unittest import mock
+from odoo.addons.treasury.tools import jadatetime as jd
+from odoo.addons.treasury.tools.jadatetime import jalali
+
+
+@tagged('-at_install', 'post_install')
+class TestJadatetime(TransactionCase):
+
+    def test_conversion_core(self):
+        """
+        closed-form conversions should agree with the month table conversions
+        """
+        for ordinal in range(226895, datetime.date(9000, 1, 1).toordinal(), 97):
+            gdate = datetime.date.fromordinal(ordinal)
+            jdate = jalali.GregorianToJalali(gdate.year, gdate.month, gdate.day).getJalaliList()
+            self.assertEqual(jalali.gregorian_to_jalali(gdate.year, gdate.month, gdate.day), jdate)
+            self.assertEqual(jalali.jalali_to_gregorian(*jdate), (gdate.year, gdate.month, gdate.day))
+            self.assertEqual(jalali.jalali_to_ordinal(*jdate), ordinal - jalali.GREGORIAN_ORDINAL_OFFSET)
+
+    def test_date_arithmetic(self):
+        """
+        date arithmetic should not depend on the Gregorian round trip
+        """
+        jdate = jd.date(1399, 12, 30)
+        self.assertEqual(jdate.togregorian(), datetime.date(2021, 3, 20))
+        self.assertEqual(jd.date.fromordinal(jdate.toordinal()), jdate)
+        self.assertEqual(jdate + datetime.timedelta(days=1), jd.date(1400, 1, 1))
+        self.assertEqual(jdate - datetime.timedelta(days=30), jd.date(1399, 11, 30))
+        self.assertEqual(jdate - jd.date(1399, 1, 1), datetime.timedelta(days=365))
+        self.assertEqual(jdate.weekday(), 0)
+
+    def test_conversion_core_speed(self):
+        """
+        date.toordinal/fromordinal should be at least twice as fast as the former Gregorian round trip
+        """
+        jdate = jd.date(1400, 2, 16)
+        namespace = {'jd': jd, 'jalali': jalali, 'date': datetime.date, 'jdate': jdate,
+                     'ordinal': jdate.toordinal(), 'offset': jalali.GREGORIAN_ORDINAL_OFFSET}
+        legacy = min(timeit.repeat(
+            'date(*jalali.JalaliToGregorian(jdate.year, jdate.month, jdate.day).getGregorianList()).toordinal() '
+            '- offset; '
+            'g = date.fromordinal(ordinal + offset); '
+            'jd.date(*jalali.GregorianToJalali(g.year, g.month, g.day).getJalaliList())',
+            globals=namespace, number=50000, repeat=7))
+        fast = min(timeit.repeat(
+            'jdate.toordinal(); jd.date.fromordinal(ordinal)',
+            globals=namespace, number=50000, repeat=7))
+        self.assertGreaterEqual(legacy / fast, 2)
+
+    def test_bulk_conversion(self):
+        """
+        bulk conversions should agree with the scalar conversions
+        """
+        gdates = [datetime.date(2021, 3, 20), datetime.date(2020, 1, 4), datetime.date(1990, 2, 28)]
+        years, months, days = jd.gregorian_to_jalali_many(gdates)
+        self.assertEqual([(int(y), int(m), int(d)) for y, m, d in zip(years, months, days)],
+                         [jalali.gregorian_to_jalali(g.year, g.month, g.day) for g in gdates])
+        self.assertEqual([int(ordinal) for ordinal in jd.jalali_to_gregorian_many(years, months, days)],
+                         [g.toordinal() for g in gdates])
+
+    @unittest.skipIf(jalali.np is None, 'NumPy is not installed')
+    def test_bulk_conversion_numpy(self):
+        """
+        bulk conversions should round trip a million datetime64 values, at least 3 times faster than scalar ones
+        """
+        np = jalali.np
+        gdates = np.arange('1950-01-01', '2100-01-01', dtype='datetime64[D]')
+        gdates = np.resize(gdates, 1000000)
+        years, months, days = jd.gregorian_to_jalali_many(gdates)
+        result = jd.jalali_to_gregorian_many(years, months, days, datetime64=True)
+        self.assertTrue((result == gdates).all())
+        self.assertEqual((int(years[0]), int(months[0]), int(days[0])), (1328, 10, 11))
+
+        namespace = {'jd': jd, 'jalali': jalali, 'gdates': gdates[:100000],
+                     'dates': [datetime.date.fromordinal(int(ordinal)) for ordinal in
+                               gdates[:100000].astype('int64') + datetime.date(1970, 1, 1).toordinal()]}
+        scalar = min(timeit.repeat(
+            '[jalali.jalali_to_ordinal(*jalali.gregorian_to_jalali(d.year, d.month, d.day)) for d in dates]',
+            globals=namespace, number=1, repeat=3))
+        bulk = min(timeit.repeat(
+            'jd.jalali_to_gregorian_many(*jd.gregorian_to_jalali_many(gdates), datetime64=True)',
+            globals=namespace, number=1, repeat=3))
+        self.assertGreaterEqual(scalar / bulk, 3)
+
+    def test_compact_instances(self):
+        """
+        dates should keep only their fields and still compare, hash and pickle
+        """
+        jdate = jd.date(1400, 1, 5, locale='fa_IR')
+        jdatetime = jd.datetime(1400, 1, 5, 10, 20, 30, 40, locale='fa_IR')
+        self.assertFalse(hasattr(jdate, '__dict__'))
+        self.assertFalse(hasattr(jdatetime, '__dict__'))
+        self.assertEqual(jdate.j_months[0], 'فروردین')
+        self.assertEqual(jd.date(1400, 1, 5, locale='en_US').j_months[0], 'Farvardin')
+        for value in (jdate, jdatetime):
+            restored = pickle.loads(pickle.dumps(value))
+            self.assertEqual(restored, value)
+            self.assertEqual(hash(restored), hash(value))
+            self.assertEqual(restored.locale, value.locale)
+        self.assertEqual(len({jd.date(1400, 1, 5), jd.date(1400, 1, 5)}), 1)
+
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            dates = [jd.date(1400, 1, day % 28 + 1) for day in range(10000)]
+            per_instance = (tracemalloc.get_traced_memory()[0] - start) / len(dates)
+        finally:
+            tracemalloc.stop()
+        self.assertLess(per_instance, 120)
+
+    def test_strftime_plan(self):
+        """
+        compiled strftime formats should render exactly like sequential replacement
+        """
+        formats = list(jd.STRFTIME_DIRECTIVES) + ['%Y-%m-%d %H:%M:%S', '%A %-d %B %Y, %p', ' %B ', 'no directive',
+                                                  '%%a', '100%', '%q %Y']
+        for locale in ('fa_IR', 'en_US'):
+            for value in (jd.date(1399, 12, 30, locale=locale), jd.datetime(1403, 7, 1, 13, 5, 9, 123, locale=locale)):
+                for fmt in formats:
+                    self.assertEqual(value.strftime(fmt), value._strftime_replace(fmt))
+        self.assertEqual(jd.date(1399, 11, 14, locale='fa_IR').strftime(' %B '), ' بهمن ')
+        self.assertIsNone(jd._compile_strftime('%%a'))
+
+
+    def test_format_datetime_plan(self):
+        """
+        LDML patterns should be compiled once and validated at compile time
+        """
+        jd._compile_pattern.cache_clear()
+        values = [jd.datetime(1403, 1, 1, 9, 5, locale='en_US') + datetime.timedelta(days=n) for n in range(100)]
+        texts = [value.format_datetime("yyyy/MM/dd HH:mm EEEE 'week' w") for value in values]
+        self.assertEqual(texts[0], '1403/01/01 09:05 Wednesday week 1')
+        self.assertEqual(jd._compile_pattern.cache_info().misses, 1)
+        self.assertEqual(jd.date(1399, 11, 14, locale='fa_IR').format_datetime('d MMMM y r'), '۱۴ بهمن ۱۳۹۹ 2020')
+        self.assertEqual(jd.date(1399, 11, 14).format_datetime('HH:mm a'), 'HH:mm a')
+        with self.assertRaises(ValueError):
+            jd.date(1399, 11, 14).format_datetime('ddd')
+
+    def test_locale_resolution_cache(self):
+        """
+        the process locale should be queried once, not on every construction or formatting
+        """
+        jd.set_locale(None)
+        with mock.patch.object(jd._locale, 'getlocale', return_value=('en_US', 'UTF-8')) as getlocale:
+            dates = [jd.date(1400, 1, day, locale='en_US') for day in range(1, 31)]
+            texts = [value.strftime('%d %B') + value.format_datetime('MMMM') for value in dates]
+            self.assertEqual(getlocale.call_count, 1)
+            self.assertEqual(texts[0], '01 FarvardinFarvardin')
+            self.assertFalse(jd.date(1400, 1, 1)._is_fa_locale())
+            self.assertTrue(jd.date(1400, 1, 1, locale=jd.FA_LOCALE)._is_fa_locale())
+        with mock.patch.object(jd._locale, 'getlocale', return_value=(jd.FA_LOCALE, 'UTF-8')):
+            self.assertFalse(jd.date(1400, 1, 1)._is_fa_locale())
+            jd.set_locale(None)
+            self.assertTrue(jd.date(1400, 1, 1)._is_fa_locale())
+        jd._locale_resolver.clear()
+
+    def test_locale_context(self):
+        """
+        module locales should be isolated per thread and asyncio task, and never leak to recycled threads
+        """
+        errors = []
+
+        def worker(locale):
+            if jd.get_locale() is not None:
+                errors.append('inherited %s' % jd.get_locale())
+            jd.set_locale(locale)
+            if jd.date(1400, 1, 1).locale != locale:
+                errors.append('lost %s' % locale)
+
+        for batch in range(20):
+            threads = [threading.Thread(target=worker, args=(jd.FA_LOCALE if n % 2 else 'en_US',))
+                       for n in range(100)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+
+        async def task(locale):
+            jd.set_locale(locale)
+            await asyncio.sleep(0)
+            return jd.get_locale()
+
+        async def gather():
+            return await asyncio.gather(*[task('locale_%d' % n) for n in range(50)])
+
+        self.assertEqual(asyncio.run(gather()), ['locale_%d' % n for n in range(50)])
+
+        previous = jd.set_locale('en_US')
+        with jd.locale_context(jd.FA_LOCALE):
+            self.assertEqual(jd.date(1400, 1, 1).locale, jd.FA_LOCALE)
+        self.assertEqual(jd.get_locale(), 'en_US')
+        jd.set_locale(previous)
+
+    def test_strptime(self):
+        """
+        strptime should compile each format once and support the common directives
+        """
+        strptime = jd.datetime.strptime
+        self.assertEqual(strptime('1403/07/15 10:20:30', '%Y/%m/%d %H:%M:%S'), jd.datetime(1403, 7, 15, 10, 20, 30))
+        self.assertEqual(strptime('03/1/5', '%y/%-m/%-d'), jd.datetime(1403, 1, 5))
+        self.assertEqual(strptime('99 1', '%y %-d'), jd.datetime(1399, 1, 1))
+        self.assertEqual(strptime('1399 366', '%Y %j'), jd.datetime(1399, 12, 30))
+        self.assertEqual(strptime('14 بهمن ۱۳۹۹', '%d %B %Y'), jd.datetime(1399, 11, 14))
+        self.assertEqual(strptime('14 Bahman 1399', '%d %B %Y'), jd.datetime(1399, 11, 14))
+        self.assertEqual(strptime('14 bah 1399', '%d %b %Y'), jd.datetime(1399, 11, 14))
+        self.assertEqual(strptime('[1399] 10:11:12.5', '[%Y] %H:%M:%S.%f').microsecond, 500000)
+        for date_string, format in [('1399/13/01', '%Y/%m/%d'), ('1400 366', '%Y %j'), ('1399-01-01', '%Y.%m.%d')]:
+            with self.assertRaises(ValueError):
+                strptime(date_string, format)
+
+    def test_strptime_speed(self):
+        """
+        parsing a column of dates in one format should not recompile the format
+        """
+        jd._compile_strptime.cache_clear()
+        date_strings = ['1403/%02d/%02d 10:20' % (n % 12 + 1, n % 29 + 1) for n in range(20000)]
+        parsed = [jd.datetime.strptime(date_string, '%Y/%m/%d %H:%M') for date_string in date_strings]
+        self.assertEqual(parsed[-1], jd.datetime(1403, 8, 19, 10, 20))
+        self.assertEqual(jd._compile_strptime.cache_info().misses, 1)
+
+        namespace = {'jd': jd, 'date_strings': date_strings[:5000]}
+        cached = min(timeit.repeat(
+            "[jd.datetime.strptime(date_string, '%Y/%m/%d %H:%M') for date_string in date_strings]",
+            globals=namespace, number=1, repeat=5))
+        compiled_each_time = min(timeit.repeat(
+            "[(jd._compile_strptime.cache_clear(), jd.datetime.strptime(date_string, '%Y/%m/%d %H:%M')) "
+            "for date_string in date_strings]",
+            globals=namespace, number=1, repeat=5))
+        self.assertGreaterEqual(compiled_each_time / cached, 1.5)
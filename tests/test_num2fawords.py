@@ -0,0 +1,111 @@
+from odoo.tests.common import TransactionCase, tagged
+import random
+import timeit
+from odoo.addons.treasury.tools import num2fawords
+
+
+@tagged('-at_install', 'post_install')
+class TestNum2fawords(TransactionCase):
+
+    def test_words(self):
+        """
+        words should read numbers group by group, joined with ' و '
+        """
+        self.assertEqual(num2fawords._THREE_DIGIT_WORDS,
+                         tuple(num2fawords._three_digit_words(n) for n in range(1000)))
+        self.assertEqual(num2fawords.words(0), 'صفر')
+        self.assertEqual(num2fawords.words(1001), 'یک هزار و یک')
+        self.assertEqual(num2fawords.words(1234567),
+                         'یک میلیون و دویست و سی و چهار هزار و پانصد و شصت و هفت')
+        self.assertEqual(num2fawords.words(10 ** 15), 'یک بیلیارد')
+        self.assertEqual(num2fawords.words(-25), 'منفی بیست و پنج')
+        self.assertEqual(num2fawords.words('۴۲'), 'چهل و دو')
+        self.assertEqual(num2fawords.words(1203.5), 'یک هزار و دویست و سه و پنج دهم')
+        self.assertEqual(num2fawords.ordinal_words(33), 'سی و سوم')
+        with self.assertRaises(ValueError):
+            num2fawords.words(10 ** 36)
+
+    def test_amount_words_cache(self):
+        """
+        equal amounts should share a cache entry, and changing the defaults should invalidate it
+        """
+        num2fawords.amount_words.cache_clear()
+        self.assertEqual(num2fawords.amount_words(1500), 'یک هزار و پانصد')
+        self.assertEqual(num2fawords.amount_words(1500.0), 'یک هزار و پانصد')
+        self.assertEqual(num2fawords.amount_words(num2fawords.Decimal('1500.00')), 'یک هزار و پانصد')
+        self.assertEqual(num2fawords.amount_words(1203.5), num2fawords.words(1203.5))
+        self.assertEqual(num2fawords.amount_words(1e16), 'ده بیلیارد')
+        info = num2fawords.amount_words.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 3))
+        try:
+            num2fawords.change_defaults(positive='مثبت ')
+            self.assertEqual(num2fawords.amount_words(1500), 'مثبت یک هزار و پانصد')
+        finally:
+            num2fawords.change_defaults(positive='')
+        self.assertEqual(num2fawords.amount_words(1500), 'یک هزار و پانصد')
+
+    def test_words_many(self):
+        """
+        words_many should yield what words would, converting repeated values once
+        """
+        numbers = [1, 1.0, True, num2fawords.Decimal('1.0'), num2fawords.Decimal('1.00'), '۴۲', 1, -3,
+                   num2fawords.Fraction(1, 3)]
+        self.assertEqual(list(num2fawords.words_many(numbers)), [num2fawords.words(n) for n in numbers])
+        self.assertEqual(list(num2fawords.words_many(numbers, negative='-')),
+                         [num2fawords.words(n, negative='-') for n in numbers])
+        with self.assertRaises(TypeError):
+            list(num2fawords.words_many([object()]))
+
+    def test_currency_words(self):
+        """
+        amounts should be rounded to the currency and read as natural words, never in scientific notation
+        """
+        self.assertEqual(num2fawords.currency_words(1e16, 1.0), 'ده بیلیارد')
+        self.assertEqual(num2fawords.currency_words(123456789012345678.0, 1.0), num2fawords.words(123456789012345680))
+        self.assertEqual(num2fawords.currency_words(0.1 + 0.2, 0.01), 'سه دهم')
+        self.assertEqual(num2fawords.currency_words(1500.5, 0.01), num2fawords.words(1500.5))
+        self.assertEqual(num2fawords.currency_words(1.07, 0.05), 'یک و پنج صدم')
+        self.assertEqual(num2fawords.currency_words(-12.5, 1.0), 'منفی سیزده')
+        self.assertEqual(num2fawords.currency_words(0.004, 0.01), 'صفر')
+        amounts = [25000000000000000.0, 0.1 + 0.2, 1500.5, -0.0, 1500.5, 12.345]
+        self.assertEqual(list(num2fawords.currency_words_many(amounts, 0.01)),
+                         [num2fawords.currency_words(amount, 0.01) for amount in amounts])
+
+    def test_amount_text(self):
+        """
+        cheque amounts should read in the precision of their currency
+        """
+        currency = self.env['res.currency'].new({'name': 'TST', 'symbol': 'T', 'rounding': 1.0})
+        outgoing = self.env['treasury.outgoing'].new({'amount': 25000000000000000.0, 'currency_id': currency})
+        self.assertEqual(outgoing.amount_text, 'بیست و پنج بیلیارد')
+
+
+# the 1M amounts run takes about half a minute, run it with --test-tags benchmark
+@tagged('-standard', 'benchmark')
+class TestNum2fawordsBenchmark(TransactionCase):
+
+    def test_words_speed(self):
+        """
+        over 1M random amounts, the precomputed three-digit words should be at least 1.5 times faster than
+        building them per group
+        """
+        def group_words(number):
+            parts = []
+            class_index = 0
+            while number:
+                number, three_digit = divmod(number, 1000)
+                if three_digit:
+                    parts.append(num2fawords._three_digit_words(three_digit) + num2fawords.CLASSES[class_index])
+                class_index += 1
+            parts.reverse()
+            return ' و '.join(parts)
+
+        rnd = random.Random(1)
+        amounts = [rnd.randint(1, 10 ** 12) for n in range(1000000)]
+        self.assertEqual([num2fawords.words(amount) for amount in amounts], [group_words(amount) for amount in amounts])
+        namespace = {'amounts': amounts, 'group_words': group_words, 'int_words': num2fawords._int_words}
+        per_group = min(timeit.repeat('[group_words(amount) for amount in amounts]',
+                                      globals=namespace, number=1, repeat=3))
+        precomputed = min(timeit.repeat('[int_words(amount) for amount in amounts]',
+                                        globals=namespace, number=1, repeat=3))
+        self.assertGreaterEqual(per_group / precomputed, 1.5)
@@ -0,0 +1,126 @@
+import os
+from odoo import exceptions
+from odoo.tests.common import TransactionCase, tagged
+from datetime import date
+from unittest import mock
+from odoo.addons.treasury.tools import check_pdf, jadatetime as jd
+
+
+@tagged('-at_install', 'post_install')
+class TestOutgoing(TransactionCase):
+
+    def test_text_fields(self):
+        """
+        text fields should be computed per record, converting each distinct due date once
+        """
+        partners = self.env['res.partner'].create([{'name': 'Beneficiary A'}, {'name': 'Beneficiary B'}])
+        outgoing = self.env['treasury.outgoing']
+        for n, due_date in enumerate([date(2021, 3, 20), date(2021, 3, 21), date(2021, 3, 20), False]):
+            outgoing |= outgoing.new({'due_date': due_date, 'amount': 1000 * (n + 1),
+                                      'beneficiary_id': partners[n % 2].id, 'reason': 'Reason %s' % n})
+        with mock.patch.object(jd.date, 'fromgregorian', wraps=jd.date.fromgregorian) as fromgregorian:
+            due_date_texts = outgoing.mapped('due_date_text')
+            self.assertEqual(fromgregorian.call_count, 2)
+        self.assertEqual(due_date_texts[0], 'سیم اسفند یک هزار و سیصد و نود و نه')
+        self.assertEqual(due_date_texts[1], 'یکم فروردین یک هزار و چهارصد')
+        self.assertEqual(due_date_texts[2], due_date_texts[0])
+        self.assertFalse(outgoing[3].due_date_text)
+        self.assertEqual(outgoing.mapped('amount_text')[:2], ['یک هزار', 'دو هزار'])
+        self.assertEqual(outgoing[1].description, 'Beneficiary B for Reason 1')
+
+    def test_print_bulk(self):
+        """
+        printing a run of checks should issue all of them and render one document with a page per check
+        """
+        checkbook = self.env['treasury.checkbook'].create({
+            'journal_id': self.env['account.journal'].search([('type', '=', 'bank')], limit=1).id,
+            'series_no': 4321,
+            'first_serial_no': 1000,
+            'select_count': 'custom_count',
+            'count': 6
+        })
+        partner = self.env['res.partner'].create({'name': 'Beneficiary'})
+        checks, spare_check = checkbook.check_ids[:5], checkbook.check_ids[5]
+        checks.write({'due_date': date(2021, 3, 20), 'amount': 1000, 'beneficiary_id': partner.id, 'reason': 'Rent'})
+        action = checks.action_print_bulk()
+        self.assertEqual(action['report_name'], 'treasury.print_check_bulk')
+        self.assertEqual(set(checks.mapped('state')), {'issued'})
+        html = self.env.ref('treasury.action_print_check_bulk')._render_qweb_html(checks.ids)[0].decode()
+        self.assertEqual(html.count('page-break-after:always'), 4)
+        self.assertEqual(html.count('class="article"'), 1)
+        with self.assertRaises(exceptions.UserError):
+            checks.action_print_bulk()
+        # a run mixing printable and printed checks is refused as a whole
+        with self.assertRaises(exceptions.UserError):
+            (checks[0] | spare_check).action_print_bulk()
+        self.assertEqual(spare_check.state, 'new')
+
+    def test_check_pdf_shaping(self):
+        """
+        Persian text should be drawn shaped and in visual order
+        """
+        self.assertEqual(check_pdf.shape('سلام'), '\ufeb3\ufefc\ufee1')
+        self.assertEqual(check_pdf.visual('سلام'), '\ufee1\ufefc\ufeb3')
+        self.assertEqual(check_pdf.visual('قسط 12'), '12 \ufec2\ufeb4\ufed7')
+        self.assertEqual(check_pdf.visual('--/1000.0/--'), '--/1000.0/--')
+
+    def test_native_check_pdf(self):
+        """
+        checks of a journal printing natively should be drawn without wkhtmltopdf
+        """
+        font_path = self.env['ir.config_parameter'].sudo().get_param('treasury.check_font_path',
+                                                                      check_pdf.DEFAULT_FONT_PATH)
+        if not os.path.isfile(font_path):
+            self.skipTest('no font for native check printing')
+        journal = self.env['account.journal'].search([('type', '=', 'bank')], limit=1)
+        journal.check_print_mode = 'native'
+        checkbook = self.env['treasury.checkbook'].create({
+            'journal_id': journal.id,
+            'series_no': 4322,
+            'first_serial_no': 1000,
+            'select_count': 'custom_count',
+            'count': 3
+        })
+        partner = self.env['res.partner'].create({'name': 'Beneficiary'})
+        checkbook.check_ids.write({'due_date': date(2021, 3, 20), 'amount': 1000, 'beneficiary_id': partner.id,
+                                   'reason': 'Rent'})
+        with mock.patch.object(type(self.env['ir.actions.report']), '_run_wkhtmltopdf') as wkhtmltopdf:
+            pdf, report_format = self.env.ref('treasury.action_print_check_bulk')._render_qweb_pdf(
+                checkbook.check_ids.ids)
+        wkhtmltopdf.assert_not_called()
+        self.assertEqual(report_format, 'pdf')
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+    def test_check_layout(self):
+        """
+        check layouts should be compiled once until they change and follow the journal of the checkbook
+        """
+        layout = self.env['treasury.check.layout'].create({
+            'name': 'Test Bank',
+            'width': 18,
+            'line_ids': [(0, 0, {'field': 'amount_text', 'right': 4, 'top': 2.5, 'fill': True}),
+                         (0, 0, {'field': 'amount', 'right': 9, 'top': 5})],
+        })
+        compiled = layout._get_compiled()
+        self.assertIs(layout._get_compiled(), compiled)
+        self.assertEqual(compiled.width, 18)
+        self.assertEqual(compiled.fields[0], check_pdf.CheckField('amount_text', 4, 2.5, True))
+
+        layout.line_ids[1].top = 6
+        recompiled = layout._get_compiled()
+        self.assertIsNot(recompiled, compiled)
+        self.assertEqual(recompiled.fields[1].top, 6)
+
+        journal = self.env['account.journal'].search([('type', '=', 'bank')], limit=1)
+        checkbook = self.env['treasury.checkbook'].create({
+            'journal_id': journal.id,
+            'series_no': 4323,
+            'first_serial_no': 1000,
+            'select_count': 'custom_count',
+            'count': 1
+        })
+        check = checkbook.check_ids
+        self.assertEqual(check._get_check_layout(), self.env.ref('treasury.check_layout_default')._get_compiled())
+        self.assertEqual(check._get_check_layout().fields, check_pdf.DEFAULT_LAYOUT.fields)
+        journal.check_layout_id = layout
+        self.assertIs(check._get_check_layout(), recompiled)
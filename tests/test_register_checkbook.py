@@ -34,6 +34,24 @@ class TestRegisterCheckBook(TransactionCase):
              for n in range(self.checkbook.count)])
         self.assertEqual(all(item == 'new' for item in [check.state for check in self.checkbook.check_ids]), True)
 
+    def test_register_checkbooks_batch(self):
+        """
+        registering several checkbooks at once should create every leaf with a distinct internal number
+        """
+        journal = self.env['account.journal'].search([('type', '=', 'bank')], limit=1)
+        checkbooks = self.env['treasury.checkbook'].create([{
+            'journal_id': journal.id,
+            'series_no': 5000 + n,
+            'first_serial_no': 1000,
+            'select_count': 'custom_count',
+            'count': 10
+        } for n in range(3)])
+        checks = checkbooks.mapped('check_ids')
+        self.assertEqual(len(checks), 30)
+        self.assertEqual(len(set(checks.mapped('name'))), 30)
+        self.assertEqual(checkbooks.mapped('remained'), [10, 10, 10])
+        self.assertEqual(checkbooks.mapped('last_serial_no'), [1010, 1010, 1010])
+
     def test_remained_check(self):
         """
         checkbook # remained should be correct when some checks state are changed
@@ -102,3 +120,61 @@ class TestRegisterCheckBook(TransactionCase):
         self.assertEqual(len(self.checkbook_ct.check_ids.filtered(lambda x: x.state in ('new', 'draft'))), 0)
         self.assertEqual(len(self.checkbook_ct.check_ids.filtered(lambda x: x.state == 'canceled')), 4)
         self.assertEqual(self.checkbook_ct.active, False)
+
+    def test_next_check(self):
+        """
+        the next check should follow the first new leaf of its own checkbook and be handed out in serial order
+        """
+        self.assertEqual(self.checkbook.next_check, '1234/123456')
+        self.assertEqual(self.checkbook_ct.next_check, '9874/65421')
+
+        leaves = {check.number: check for check in self.checkbook.check_ids}
+        leaves['1234/123456'].action_issue()
+        leaves['1234/123458'].action_issue()
+        self.assertEqual(self.checkbook.next_serial_no, 123457)
+        self.assertEqual(self.checkbook.next_check, '1234/123457')
+
+        checks = self.checkbook._take_next_checks(2)
+        self.assertEqual(checks.mapped('number'), ['1234/123457', '1234/123459'])
+        self.assertEqual(set(checks.mapped('state')), {'draft'})
+        self.assertEqual(self.checkbook.next_check, '1234/123460')
+
+        leaves['1234/123458'].write({'state': 'new'})
+        self.assertEqual(self.checkbook.next_check, '1234/123458')
+
+        self.checkbook.check_ids.write({'state': 'issued'})
+        self.assertEqual(self.checkbook.next_check, False)
+        self.assertFalse(self.checkbook._take_next_checks())
+        self.assertEqual(self.checkbook_ct.next_check, '9874/65421')
+
+        # a new leaf renumbered into another checkbook moves the cursors of both books
+        self.checkbook_ct.check_ids.filtered(lambda check: check.number == '9874/65421').write(
+            {'state': 'issued', 'number': '9874/65421-spoiled'})
+        self.assertEqual(self.checkbook_ct.next_check, '9874/65422')
+        leaves['1234/123459'].write({'state': 'new'})
+        self.assertEqual(self.checkbook.next_check, '1234/123459')
+        leaves['1234/123459'].write({'checkbook_id': self.checkbook_ct.id, 'number': '9874/65421'})
+        self.assertEqual(self.checkbook.next_check, False)
+        self.assertEqual(self.checkbook_ct.next_check, '9874/65421')
+
+    def test_leaf_counters(self):
+        """
+        the leaf counters should follow the check states and be rebuilt by the reconciliation job
+        """
+        self.assertEqual((self.checkbook.leaf_count, self.checkbook.unused_count, self.checkbook.closed_count),
+                         (6, 6, 0))
+        self.checkbook.check_ids[:2].write({'state': 'issued'})
+        self.checkbook.check_ids[2].state = 'canceled'
+        self.assertEqual((self.checkbook.leaf_count, self.checkbook.unused_count, self.checkbook.closed_count),
+                         (6, 3, 1))
+        self.assertEqual(self.checkbook.remained, 3)
+        self.assertEqual(self.checkbook_ct.remained, 8)
+
+        self.env.cr.execute("UPDATE treasury_checkbook SET unused_count = 0, closed_count = 6 WHERE id = %s",
+                            (self.checkbook.id,))
+        self.checkbook.invalidate_cache()
+        self.env['treasury.checkbook']._cron_reconcile_leaf_counters()
+        self.assertEqual((self.checkbook.leaf_count, self.checkbook.unused_count, self.checkbook.closed_count),
+                         (6, 3, 1))
+        self.assertEqual(self.checkbook.remained, 3)
+        self.assertEqual(self.checkbook.state, 'open')
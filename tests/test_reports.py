@@ -0,0 +1,53 @@
+from odoo.tests.common import TransactionCase, tagged
+from datetime import date, timedelta
+
+
+@tagged('-at_install', 'post_install')
+class TestReports(TransactionCase):
+    def setUp(self):
+        super(TestReports, self).setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Report Partner'})
+        today = date.today()
+        self.incoming = self.env['treasury.incoming'].create([{
+            'number': 'report_test_{}'.format(days),
+            'type': 'check',
+            'received_date': today,
+            'due_date': today + timedelta(days=days),
+            'amount': amount,
+            'consignee_id': self.partner.id,
+            'issued_by': 'Issuer'
+        } for days, amount in ((-100, 1000), (-45, 2000), (0, 3000), (5, 4000), (60, 5000))])
+        self.incoming.write({'state': 'undeposited'})
+
+    def test_aging_report(self):
+        """
+        aging report should put each open security in its due date bucket
+        """
+        self.env['treasury.aging.report']._refresh_view()
+        line = self.env['treasury.aging.report'].search([('partner_id', '=', self.partner.id),
+                                                          ('direction', '=', 'incoming')])
+        self.assertEqual(len(line), 1)
+        self.assertEqual(line.overdue_90, 1000)
+        self.assertEqual(line.overdue_30, 2000)
+        self.assertEqual(line.due, 3000)
+        self.assertEqual(line.next_7, 4000)
+        self.assertEqual(line.next_90, 5000)
+        self.assertEqual(line.amount_total, 15000)
+
+    def test_cash_forecast(self):
+        """
+        cash flow forecast should follow state and amount changes of the securities
+        """
+        doc = self.incoming[2]
+        forecast = self.env['treasury.cash.forecast']
+        domain = [('period_type', '=', 'month'), ('company_id', '=', doc.company_id.id),
+                  ('date_from', '<=', doc.due_date), ('date_to', '>=', doc.due_date)]
+        before = sum(forecast.search(domain).mapped('incoming_amount'))
+
+        doc.amount = 3500
+        self.assertEqual(sum(forecast.search(domain).mapped('incoming_amount')), before + 500)
+        doc.write({'state': 'collected'})
+        self.assertEqual(sum(forecast.search(domain).mapped('incoming_amount')), before - 3000)
+
+        forecast._rebuild()
+        self.assertEqual(sum(forecast.search(domain).mapped('incoming_amount')), before - 3000)
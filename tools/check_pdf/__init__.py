@@ -0,0 +1,202 @@
+"""Draw cheques straight into a PDF, without wkhtmltopdf.
+
+Cheque forms are a handful of right-aligned Persian strings at fixed
+positions, so they are drawn with reportlab. Persian text is shaped into
+Arabic presentation forms and put in visual order here, since reportlab
+draws glyphs as given.
+"""
+
+import re as _re
+from collections import namedtuple
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+# DejaVu Sans has the Arabic presentation forms and ships with most wkhtmltopdf setups
+DEFAULT_FONT_PATH = '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+
+# a printed field: offsets in cm from the top right corner of the cheque box; filled fields are followed by
+# stars up to the left edge of the box
+CheckField = namedtuple('CheckField', 'name right top fill')
+# a cheque form: width in cm of the centered box the fields are positioned in, fonts and CheckField tuple
+CheckLayout = namedtuple('CheckLayout', 'width font_family font_path font_size fields')
+
+# the positions of treasury.print_check_fields before layouts were configurable
+DEFAULT_LAYOUT = CheckLayout(width=17, font_family='', font_path=DEFAULT_FONT_PATH, font_size=11, fields=(
+    CheckField('due_date', 2.66, 0.9, False),
+    CheckField('due_date_text', 3.14, 1.58, False),
+    CheckField('amount_text', 4.65, 2.7, True),
+    CheckField('description', 1.4, 3.7, True),
+    CheckField('amount', 10, 5.53, False),
+))
+
+# isolated, final[, initial, medial] presentation forms of the Persian and Arabic letters
+_FORMS = {
+    'ء': ('\ufe80',),
+    'آ': ('\ufe81', '\ufe82'),
+    'أ': ('\ufe83', '\ufe84'),
+    'ؤ': ('\ufe85', '\ufe86'),
+    'إ': ('\ufe87', '\ufe88'),
+    'ئ': ('\ufe89', '\ufe8a', '\ufe8b', '\ufe8c'),
+    'ا': ('\ufe8d', '\ufe8e'),
+    'ب': ('\ufe8f', '\ufe90', '\ufe91', '\ufe92'),
+    'ة': ('\ufe93', '\ufe94'),
+    'ت': ('\ufe95', '\ufe96', '\ufe97', '\ufe98'),
+    'ث': ('\ufe99', '\ufe9a', '\ufe9b', '\ufe9c'),
+    'ج': ('\ufe9d', '\ufe9e', '\ufe9f', '\ufea0'),
+    'ح': ('\ufea1', '\ufea2', '\ufea3', '\ufea4'),
+    'خ': ('\ufea5', '\ufea6', '\ufea7', '\ufea8'),
+    'د': ('\ufea9', '\ufeaa'),
+    'ذ': ('\ufeab', '\ufeac'),
+    'ر': ('\ufead', '\ufeae'),
+    'ز': ('\ufeaf', '\ufeb0'),
+    'س': ('\ufeb1', '\ufeb2', '\ufeb3', '\ufeb4'),
+    'ش': ('\ufeb5', '\ufeb6', '\ufeb7', '\ufeb8'),
+    'ص': ('\ufeb9', '\ufeba', '\ufebb', '\ufebc'),
+    'ض': ('\ufebd', '\ufebe', '\ufebf', '\ufec0'),
+    'ط': ('\ufec1', '\ufec2', '\ufec3', '\ufec4'),
+    'ظ': ('\ufec5', '\ufec6', '\ufec7', '\ufec8'),
+    'ع': ('\ufec9', '\ufeca', '\ufecb', '\ufecc'),
+    'غ': ('\ufecd', '\ufece', '\ufecf', '\ufed0'),
+    'ف': ('\ufed1', '\ufed2', '\ufed3', '\ufed4'),
+    'ق': ('\ufed5', '\ufed6', '\ufed7', '\ufed8'),
+    'ك': ('\ufed9', '\ufeda', '\ufedb', '\ufedc'),
+    'ل': ('\ufedd', '\ufede', '\ufedf', '\ufee0'),
+    'م': ('\ufee1', '\ufee2', '\ufee3', '\ufee4'),
+    'ن': ('\ufee5', '\ufee6', '\ufee7', '\ufee8'),
+    'ه': ('\ufee9', '\ufeea', '\ufeeb', '\ufeec'),
+    'و': ('\ufeed', '\ufeee'),
+    'ى': ('\ufeef', '\ufef0'),
+    'ي': ('\ufef1', '\ufef2', '\ufef3', '\ufef4'),
+    'پ': ('\ufb56', '\ufb57', '\ufb58', '\ufb59'),
+    'چ': ('\ufb7a', '\ufb7b', '\ufb7c', '\ufb7d'),
+    'ژ': ('\ufb8a', '\ufb8b'),
+    'ک': ('\ufb8e', '\ufb8f', '\ufb90', '\ufb91'),
+    'گ': ('\ufb92', '\ufb93', '\ufb94', '\ufb95'),
+    'ی': ('\ufbfc', '\ufbfd', '\ufbfe', '\ufbff'),
+}
+
+# lam followed by an alef: isolated and final forms of the ligature
+_LAM_ALEF = {
+    'آ': ('\ufef5', '\ufef6'),
+    'أ': ('\ufef7', '\ufef8'),
+    'إ': ('\ufef9', '\ufefa'),
+    'ا': ('\ufefb', '\ufefc'),
+}
+
+_ZWNJ = '\u200c'
+_MIRRORED = str.maketrans('()[]{}<>«»', ')(][}{><»«')
+_RTL_CHARS = _re.compile('[\u0600-\u06ff\ufb50-\ufdff\ufe70-\ufeff]')
+# left-to-right runs: latin letters and digits, with the separators they usually carry
+_LTR_RUN = _re.compile(r"[0-9A-Za-z۰-۹٠-٩](?:[0-9A-Za-z۰-۹٠-٩.,:/_'\- ]*"
+                       r"[0-9A-Za-z۰-۹٠-٩])?")
+
+_registered_fonts = {}
+
+
+def _is_transparent(char):
+    # harakat do not break joining
+    return '\u064b' <= char <= '\u065f' or char == '\u0670'
+
+
+def shape(text):
+    """Return text with its Persian and Arabic letters replaced by their contextual presentation forms."""
+    result = []
+    length = len(text)
+    joins_next = False  # whether the previous letter connects to the next one
+    idx = 0
+    while idx < length:
+        char = text[idx]
+        forms = _FORMS.get(char)
+        if forms is None:
+            if not _is_transparent(char):
+                joins_next = False
+            if char != _ZWNJ:
+                result.append(char)
+            idx += 1
+            continue
+
+        next_idx = idx + 1
+        while next_idx < length and _is_transparent(text[next_idx]):
+            next_idx += 1
+        next_char = text[next_idx] if next_idx < length else ''
+
+        if char == 'ل' and next_char in _LAM_ALEF:
+            result.append(_LAM_ALEF[next_char][1 if joins_next else 0])
+            result.extend(text[idx + 1:next_idx])
+            joins_next = False
+            idx = next_idx + 1
+            continue
+
+        dual_joining = len(forms) == 4
+        links_next = dual_joining and len(_FORMS.get(next_char, ())) > 1
+        if joins_next:
+            result.append(forms[3] if links_next else forms[1])
+        else:
+            result.append(forms[2] if links_next else forms[0])
+        joins_next = dual_joining
+        idx += 1
+    return ''.join(result)
+
+
+def visual(text):
+    """Return a right-to-left line of text in visual (left to right) order, with its letters shaped."""
+    if not _RTL_CHARS.search(text):
+        return text
+    text = shape(text)
+    segments = []
+    pos = 0
+    for run in _LTR_RUN.finditer(text):
+        segments.append(text[pos:run.start()][::-1].translate(_MIRRORED))
+        segments.append(run.group())
+        pos = run.end()
+    segments.append(text[pos:][::-1].translate(_MIRRORED))
+    segments.reverse()
+    return ''.join(segments)
+
+
+def _register_font(font_path):
+    font_name = _registered_fonts.get(font_path)
+    if font_name is None:
+        font_name = 'TreasuryCheck%d' % len(_registered_fonts)
+        pdfmetrics.registerFont(TTFont(font_name, font_path))
+        _registered_fonts[font_path] = font_name
+    return font_name
+
+
+def render_checks(checks, page_size=A4):
+    """Return the PDF drawing one cheque per page.
+
+    ``checks`` is an iterable of (layout, values) pairs: a CheckLayout, whose font_path must be a TrueType
+    font with Persian glyphs, and a {field: text} dict.
+    """
+    page_width, page_height = page_size
+    output = BytesIO()
+    pdf = canvas.Canvas(output, pagesize=page_size, pageCompression=1)
+    metrics = {}
+    for layout, values in checks:
+        if layout not in metrics:
+            font_name = _register_font(layout.font_path)
+            font_size = layout.font_size or DEFAULT_LAYOUT.font_size
+            box_left = (page_width - layout.width * cm) / 2
+            metrics[layout] = (font_name, font_size, box_left, box_left + layout.width * cm,
+                               pdfmetrics.getAscent(font_name, font_size),
+                               pdfmetrics.stringWidth('*', font_name, font_size))
+        font_name, font_size, box_left, box_right, ascent, star_width = metrics[layout]
+        pdf.setFont(font_name, font_size)
+        for field in layout.fields:
+            text = visual(values.get(field.name) or '')
+            x = box_right - field.right * cm
+            y = page_height - field.top * cm - ascent
+            if field.fill:
+                text_width = pdfmetrics.stringWidth(text, font_name, font_size) if text else 0
+                stars = int((x - text_width - box_left) // star_width) if star_width else 0
+                text = '*' * max(stars, 0) + (' ' if text and stars > 0 else '') + text
+            pdf.drawRightString(x, y, text)
+        pdf.showPage()
+    pdf.save()
+    return output.getvalue()
@@ -6,6 +6,9 @@
 # was licensed under the Python license. Same license applies to all files in
 # the jdatetime package project.
 
+import contextlib
+import contextvars
+import functools
 import platform
 import datetime as py_datetime
 import locale as _locale
@@ -13,13 +16,10 @@ import re as _re
 from dateutil import relativedelta
 from datetime import timedelta
 
-try:
-    from greenlet import getcurrent as get_ident
-except ImportError:
-    from _thread import get_ident
-
 from .jalali import (GregorianToJalali, JalaliToGregorian,
-                     j_days_in_month)
+                     j_days_in_month, j_days_before_month, GREGORIAN_ORDINAL_OFFSET,
+                     jalali_to_ordinal, ordinal_to_jalali,
+                     gregorian_to_jalali_many, jalali_to_gregorian_many)
 
 # Making translators
 make_translations = lambda n, m: dict((ord(a), b) for a, b in zip(n, m))
@@ -76,39 +76,92 @@ class time(py_datetime.time):
         return "jadatetime.time(%s, %s, %s)" % (self.hour, self.minute, self.second)
 
 
-_thread_local_locales = dict()
+class _LocaleResolver(object):
+    """Tell whether a locale renders in Persian.
+
+    The process locale is queried once and cached, since locale.getlocale and locale.getdefaultlocale are
+    C-level calls. ``set_locale`` clears the cache; call ``clear`` after changing the process locale with
+    locale.setlocale.
+    """
+
+    def __init__(self):
+        self._system_fa = None
+
+    def clear(self):
+        self._system_fa = None
+
+    def is_fa(self, locale):
+        if locale and locale == FA_LOCALE:
+            return True
+        system_fa = self._system_fa
+        if system_fa is None:
+            system_fa = self._system_fa = self._query_system_locale()
+        return system_fa
+
+    @staticmethod
+    def _query_system_locale():
+        current_locale = _locale.getlocale()
+        if FA_LOCALE in current_locale:
+            return True
+        if None not in current_locale:
+            return False
+        return FA_LOCALE in _locale.getdefaultlocale()
+
+
+_locale_resolver = _LocaleResolver()
+
+_context_locale = contextvars.ContextVar('jadatetime_locale', default=None)
 
 
 def set_locale(locale):
-    """Set the thread local module locale. This will be the default locale
-    for new date/datetime instances in current thread.
-    Returns the previous value of locale set on current thread.
+    """Set the context local module locale. This will be the default locale
+    for new date/datetime instances in the current thread, greenlet or asyncio task.
+    Returns the previous value of locale set on the current context.
 
-    Note: since Python thread identities maybe recycled and reused,
-    always ensure the desied locale is set for current thread,
-    or the locale maybe affected by previous threads with the same
-    identity.
+    New threads start with no locale set, asyncio tasks inherit the locale
+    of the context that created them.
 
     :param str|None: locale
     :return: str|None
     """
-    thread_identity = get_ident()
-    prev_locale = _thread_local_locales.get(thread_identity)
-    _thread_local_locales[thread_identity] = locale
+    prev_locale = _context_locale.get()
+    _context_locale.set(locale)
+    _locale_resolver.clear()
     return prev_locale
 
 
 def get_locale():
-    """Get the thread local module locale. This will be the default locale
-    for newly date/datetime instances in current thread.
+    """Get the context local module locale. This will be the default locale
+    for newly date/datetime instances in the current context.
 
     :return: str|None
     """
-    return _thread_local_locales.get(get_ident())
+    return _context_locale.get()
+
+
+@contextlib.contextmanager
+def locale_context(locale):
+    """Use ``locale`` as the module locale inside a with block, restoring the previous one on exit.
+
+    :param str|None: locale
+    """
+    token = _context_locale.set(locale)
+    _locale_resolver.clear()
+    try:
+        yield locale
+    finally:
+        _context_locale.reset(token)
+
+
+def _reconstruct(cls, args, locale):
+    """Unpickle a date or datetime."""
+    return cls(*args, locale=locale)
 
 
 class date(object):
     """date(year, month, day) --> date object"""
+    __slots__ = ('__year', '__month', '__day', '__locale', '__names')
+
     j_months_en = ('Farvardin',
                    'Ordibehesht',
                    'Khordad',
@@ -235,10 +288,19 @@ class date(object):
     def locale(self):
         return self.__locale
 
-    __year = 0
-    __month = 0
-    __day = 0
-    __locale = None
+    # locale dependent names, resolved from the shared table of the instance locale
+    j_months = property(lambda self: self.__names['j_months'])
+    j_months_short = property(lambda self: self.__names['j_months_short'])
+    j_weekdays = property(lambda self: self.__names['j_weekdays'])
+    j_weekdays_short = property(lambda self: self.__names['j_weekdays_short'])
+    j_ampm = property(lambda self: self.__names['j_ampm'])
+    j_ampm_short = property(lambda self: self.__names['j_ampm_short'])
+    j_quarter = property(lambda self: self.__names['j_quarter'])
+    j_quarter_short = property(lambda self: self.__names['j_quarter_short'])
+    j_GMT = property(lambda self: self.__names['j_GMT'])
+    j_era = property(lambda self: self.__names['j_era'])
+    j_era_short = property(lambda self: self.__names['j_era_short'])
+    j_era_narrow = property(lambda self: self.__names['j_era_narrow'])
 
     def _check_arg(self, value):
         if isinstance(value, int):
@@ -271,43 +333,11 @@ class date(object):
         self.__day = day
         self.__locale = kwargs['locale'] if ('locale' in kwargs and kwargs['locale']) else get_locale()
 
-        if self._is_fa_locale():
-            self.j_months = self.j_months_fa
-            self.j_months_short = self.j_months_short_fa
-            self.j_weekdays = self.j_weekdays_fa
-            self.j_weekdays_short = self.j_weekdays_short_fa
-            self.j_ampm = self.j_ampm_fa
-            self.j_ampm_short = self.j_ampm_short_fa
-            self.j_quarter = self.j_quarter_fa
-            self.j_quarter_short = self.j_quarter_short_fa
-            self.j_GMT = self.j_GMT_fa
-            self.j_era = self.j_era_fa
-            self.j_era_short = self.j_era_short_fa
-            self.j_era_narrow = self.j_era_narrow_fa
-        else:
-            self.j_months = self.j_months_en
-            self.j_months_short = self.j_months_short_en
-            self.j_weekdays = self.j_weekdays_en
-            self.j_weekdays_short = self.j_weekdays_short_en
-            self.j_ampm = self.j_ampm_en
-            self.j_ampm_short = self.j_ampm_short_en
-            self.j_quarter = self.j_quarter_en
-            self.j_quarter_short = self.j_quarter_short_en
-            self.j_GMT = self.j_GMT_en
-            self.j_era = self.j_era_en
-            self.j_era_short = self.j_era_short_en
-            self.j_era_narrow = self.j_era_narrow_en
+        self.__names = _LOCALE_NAMES_FA if _locale_resolver.is_fa(self.__locale) else _LOCALE_NAMES_EN
 
     def _is_fa_locale(self):
-        if self.__locale and self.__locale == FA_LOCALE:
-            return True
-        if FA_LOCALE in _locale.getlocale():
-            return True
-        if None not in _locale.getlocale():
-            return False
-        if FA_LOCALE in _locale.getdefaultlocale():
-            return True
-        return False
+        # resolved once, when the instance is created
+        return self.__names is _LOCALE_NAMES_FA
 
     """The smallest possible difference between
     non-equal date objects, timedelta(days=1)."""
@@ -327,10 +357,7 @@ class date(object):
 
     def togregorian(self):
         """Convert current jalali date to gregorian and return datetime.date"""
-        (y, m, d) = JalaliToGregorian(self.year,
-                                      self.month,
-                                      self.day).getGregorianList()
-        return py_datetime.date(y, m, d)
+        return py_datetime.date.fromordinal(self.toordinal() + GREGORIAN_ORDINAL_OFFSET)
 
     @staticmethod
     def fromgregorian(**kw):
@@ -344,15 +371,13 @@ class date(object):
         if 'date' in kw:
             d = kw['date']
             try:
-                (y, m, d) = GregorianToJalali(d.year,
-                                              d.month,
-                                              d.day).getJalaliList()
+                (y, m, d) = ordinal_to_jalali(d.toordinal() - GREGORIAN_ORDINAL_OFFSET)
                 return date(y, m, d, locale=locale)
             except AttributeError:
                 raise ValueError('When calling fromgregorian(date=) the parameter should be a date like object.')
         if 'day' in kw and 'month' in kw and 'year' in kw:
-            (year, month, day) = (kw['year'], kw['month'], kw['day'])
-            (y, m, d) = GregorianToJalali(year, month, day).getJalaliList()
+            gdate = py_datetime.date(kw['year'], kw['month'], kw['day'])
+            (y, m, d) = ordinal_to_jalali(gdate.toordinal() - GREGORIAN_ORDINAL_OFFSET)
             return date(y, m, d, locale=locale)
 
         error_msg = ["fromgregorian have to be be called"]
@@ -365,29 +390,25 @@ class date(object):
     def today():
         """Current date or datetime:  same as self.__class__.fromtimestamp(time.time())."""
         to = py_datetime.date.today()
-        (y, m, d) = GregorianToJalali(to.year,
-                                      to.month,
-                                      to.day).getJalaliList()
+        (y, m, d) = ordinal_to_jalali(to.toordinal() - GREGORIAN_ORDINAL_OFFSET)
         return date(y, m, d)
 
     @staticmethod
     def fromtimestamp(timestamp):
         d = py_datetime.date.fromtimestamp(timestamp)
-        (y, m, d) = GregorianToJalali(d.year, d.month, d.day).getJalaliList()
+        (y, m, d) = ordinal_to_jalali(d.toordinal() - GREGORIAN_ORDINAL_OFFSET)
         return date(y, m, d)
 
     def toordinal(self):
         """Return proleptic jalali ordinal. Farvardin 1 of year 1 which is equal to 622-3-21 of Gregorian."""
-        d = self.togregorian()
-        return d.toordinal() - 226894
+        return jalali_to_ordinal(self.year, self.month, self.day)
 
     @staticmethod
     def fromordinal(ordinal):
         """int -> date corresponding to a proleptic Jalali ordinal. it starts from Farvardin 1 of year 1, which is equal to 622-3-21 of Gregorian"""
         if ordinal < 1:
             raise ValueError("ordinal must be >= 1")
-        d = py_datetime.date.fromordinal(226894 + ordinal)
-        (y, m, d) = GregorianToJalali(d.year, d.month, d.day).getJalaliList()
+        (y, m, d) = ordinal_to_jalali(ordinal)
         return date(y, m, d)
 
     def __repr__(self):
@@ -400,8 +421,10 @@ class date(object):
 
     def __add__(self, other):
         """x.__add__(y) <==> x+y"""
-        if isinstance(other, relativedelta.relativedelta) or \
-                isinstance(other, py_datetime.timedelta):
+        if isinstance(other, py_datetime.timedelta):
+            (y, m, d) = ordinal_to_jalali(self.toordinal() + other.days)
+            return date(y, m, d, locale=self.locale)
+        if isinstance(other, relativedelta.relativedelta):
             return date.fromgregorian(date=self.togregorian() + other, locale=self.locale)
         raise TypeError(
             "unsupported operand type(s) for +: '%s' and '%s'" %
@@ -410,11 +433,13 @@ class date(object):
     def __sub__(self, other):
         """x.__sub__(y) <==> x-y"""
 
-        if isinstance(other, relativedelta.relativedelta) or \
-                isinstance(other, py_datetime.timedelta):
+        if isinstance(other, py_datetime.timedelta):
+            (y, m, d) = ordinal_to_jalali(self.toordinal() - other.days)
+            return date(y, m, d, locale=self.locale)
+        if isinstance(other, relativedelta.relativedelta):
             return date.fromgregorian(date=self.togregorian() - other, locale=self.locale)
         if isinstance(other, date):
-            return self.togregorian() - other.togregorian()
+            return timedelta(days=self.toordinal() - other.toordinal())
         if isinstance(other, py_datetime.date):
             return self.togregorian() - other
 
@@ -529,6 +554,9 @@ class date(object):
         gd = self.togregorian()
         return gd.__hash__()
 
+    def __reduce__(self):
+        return _reconstruct, (self.__class__, (self.year, self.month, self.day), self.locale)
+
     def ctime(self):
         """Return ctime() style string."""
         return self.strftime("%c")
@@ -550,17 +578,13 @@ class date(object):
 
     def yday(self):
         """return day of year"""
-        day = 0
-        for i in range(0, self.month - 1):
-            day = day + j_days_in_month[i]
-        day = day + self.day
-        return day
+        return j_days_before_month[self.month - 1] + self.day
 
     def weekday(self):
         """Return the day of the week represented by the date.
         Shanbeh == 0 ... Jomeh == 6"""
-        gd = self.togregorian()
-        return (gd.weekday() - 5) % 7
+        # Gregorian ordinal 1 is a Monday, which is 2 in Jalali weekdays
+        return (self.toordinal() + GREGORIAN_ORDINAL_OFFSET + 1) % 7
 
     def isoweekday(self):
         """Return the day of the week as an integer, where Shanbeh is 1 and Jomeh is 7"""
@@ -594,11 +618,16 @@ class date(object):
 
     def strftime(self, fmt):
         """format -> strftime() style string."""
-        # TODO: change stupid str.replace
-        # formats = {
-        #           '%a': lambda: self.j_weekdays_short[self.weekday()]
-        # }
-        # find all %[a-zA-Z] and call method if it in formats
+        plan = _compile_strftime(fmt)
+        if plan is None:
+            return self._strftime_replace(fmt)
+        res = ''.join([segment if segment.__class__ is str else segment(self) for segment in plan])
+        if self._is_fa_locale():
+            res = res.translate(persian_converter)
+        return res
+
+    def _strftime_replace(self, fmt):
+        """strftime by sequential replacement, kept for formats with a '%' that starts no directive."""
 
         # convert to unicode
 
@@ -729,209 +758,22 @@ class date(object):
         Warning: Time Zone names are not properly handled.
         """
 
+        fa_locale = self._is_fa_locale()
         result = []
-        for tok_type, tok_value in _tokenize_pattern(fmt):
-            if tok_type == "chars":
-                result.append(tok_value.replace('%', '%%'))
-            elif tok_type == "field":
-                fieldchar, fieldnum = tok_value
-                limit = PATTERN_CHARS[fieldchar]
-                if limit and fieldnum not in limit:
-                    raise ValueError('Invalid length for field: %r'
-                                     % (fieldchar * fieldnum))
-                res = self.parse_token(fieldchar, fieldnum)
-                if self._is_fa_locale() and fieldchar != 'r':
+        for segment in _compile_pattern(fmt):
+            if segment.__class__ is str:
+                result.append(segment)
+            else:
+                field, num, translate = segment
+                res = field(self, num)
+                if fa_locale and translate:
                     res = res.translate(persian_converter)
                 result.append(res)
-            else:
-                raise NotImplementedError("Unknown token type: %s" % tok_type)
         return ''.join(result)
 
     def parse_token(self, token, num):
-
-        # Date Formats
-        if token == 'G':
-            if num < 4:
-                return self.j_era_short[int(self.year >= 0)]
-            elif num == 4:
-                return self.j_era[int(self.year >= 0)]
-            elif num == 5:
-                return self.j_era_narrow[int(self.year >= 0)]
-
-        if token == 'y' or token == 'Y' or token == 'U':
-            year = abs(self.year)
-            if num == 2:
-                return '{}'.format(str(year)[-2:]) if year > 9 else '{:02d}'.format(year)
-            else:
-                return '{:0{}d}'.format(year, num)
-
-        if token == 'u':
-            return '{:0{}d}'.format(self.year, num)
-
-        if token == 'r':
-            return '{:0{}d}'.format(self.year + 621, num)
-
-        if token == 'q' or token == 'Q':
-            quarter = (self.month - 1) // 3
-            if num < 3:
-                return '{:0{}d}'.format(quarter + 1, num)
-            elif num == 4:
-                return self.j_quarter[quarter]
-            elif num == 5 and not self._is_fa_locale():
-                return '{:d}'.format(quarter)
-            else:  # 3 or 5, short nd narrow are the same
-                return self.j_quarter_short[quarter]
-
-        if token == 'M' or token == 'L':
-            if num < 3:
-                return '{:0{}d}'.format(self.month, num)
-            elif num == 3:
-                return self.j_months_short[self.month - 1]
-            elif num == 4:
-                return self.j_months[self.month - 1]
-            elif num == 5:
-                self.j_months[self.month - 1][0]
-
-        if token == 'w':
-            return '{:0{}d}'.format(self.weeknumber(), num)
-
-        if token == 'W':
-            return '{:d}'.format(self.weekofmonth())
-
-        if token == 'd':
-            return '{:0{}d}'.format(self.day, num)
-
-        if token == 'D':
-            return '{:0{}d}'.format(self.yday(), num)
-
-        if token == 'F':
-            # if dayofweek of self is equal or greater than first of month, it should be equal to self.weekofmonth()
-            # otherwise, it is one less because first week of month does not have self.weekday (it starts later)
-            return '{:d}'.format(self.weekofmonth() - int(self.weekday() < self.replace(day=1).weekday()))
-
-        if token == 'E':
-            if num < 4:
-                return self.j_weekdays_short[self.weekday()]
-            elif num == 4:
-                return self.j_weekdays[self.weekday()]
-            elif num == 5:
-                return self.j_weekdays[self.weekday()][0]
-            elif num == 6:
-                return self.j_weekdays[self.weekday()][:2]
-
-        if token == 'e':
-            if num < 3:
-                return '{:0{}d}'.format(self.weekday(), num)
-            elif num == 3:
-                return self.j_weekdays_short[self.weekday()]
-            elif num == 4:
-                return self.j_weekdays[self.weekday()]
-            elif num == 5:
-                return self.j_weekdays[self.weekday()][0]
-            elif num == 6:
-                return self.j_weekdays[self.weekday()][:2]
-
-        if token == 'c':
-            if num < 3:
-                return '{:d}'.format(self.weekday())
-            elif num == 3:
-                return self.j_weekdays_short[self.weekday()]
-            elif num == 4:
-                return self.j_weekdays[self.weekday()]
-            elif num == 5:
-                return self.j_weekdays[self.weekday()][0]
-            elif num == 6:
-                return self.j_weekdays[self.weekday()][:2]
-
-        # if it called on date object but the token is a time token, exception would raise. it does not touch the time
-        # tokens and does not raise exception as well.
-        try:
-            if token == 'a':
-                if num < 4:
-                    return self.j_ampm_short[int(self.hour >= 12)]
-                elif num == 4:
-                    return self.j_ampm[int(self.hour >= 12)]
-                elif num == 5:
-                    return self.j_ampm[int(self.hour >= 12)][0]
-
-            if token == 'h':
-                return '{:0{}d}'.format(self.hour % 12 or 12, num)
-            if token == 'H':
-                return '{:0{}d}'.format(self.hour, num)
-            if token == 'k':
-                return '{:0{}d}'.format(self.hour % 12, num)
-            if token == 'K':
-                return '{:0{}d}'.format(self.hour + 1, num)
-
-            if token == 'm':
-                return '{:0{}d}'.format(self.minute, num)
-
-            if token == 's':
-                return '{:0{}d}'.format(self.second, num)
-
-            if token == 'S':
-                # note: babel rounds microseconds but LDML specifies it should be truncated
-                return '{:0<{}}'.format(str(self.microsecond)[:num], num)
-
-            if token == 'A':
-                ms = int(((self.hour * 60 + self.minute) * 60 + self.second) * 1000 + self.microsecond / 1000)
-                # note: babel rounds microseconds but LDML specifies it should be truncated
-                return '{:0{}d}'.format(ms, num)
-
-            if token == 'z' or token == 'v' or token == 'V':
-                # it needs a hell amount of data, we just tzname
-                return self.tzinfo.tzname(self)
-
-            # Time Zone calculations
-            sign = "+"
-            diff = self.tzinfo.utcoffset(self)
-            diff_sec = diff.seconds
-            if diff.days > 0 or diff.days < -1:
-                raise ValueError(
-                    "tzinfo.utcoffset() returned big time delta! ; must be in -1439 .. 1439")
-            if diff.days != 0:
-                sign = "-"
-                diff_sec = (1 * 24 * 60 * 60) - diff_sec
-            tmp_min = diff_sec // 60
-            diff_hour = tmp_min // 60
-            diff_min = tmp_min % 60
-            diff_frac_sec = diff_sec % 60
-
-            if token == 'Z':
-                if num < 4:
-                    return '{}{:02d}{:02d}'.format(sign, diff_hour, diff_min)
-                elif num == 4:
-                    return '{}{}{:d}:{:02d}'.format(self.j_GMT, sign, diff_hour, diff_min)
-                elif num == 5:
-                    if diff_sec == 0:
-                        return 'Z'
-                    return '{}{:02d}:{:02d}'.format(sign, diff_hour, diff_min) + ':{}'.format(
-                        diff_frac_sec) if diff_frac_sec else ''
-
-            if token == 'O':
-                if num == 1:
-                    return '{}{}{:d}'.format(self.j_GMT, sign, diff_hour) + (
-                        '{:d}'.format(diff_min) if diff_min else '')
-                elif num == 4:
-                    return '{}{}{:02d}:{:02d}'.format(self.j_GMT, sign, diff_hour, diff_min)
-
-            if token == 'X' or token == 'x':
-                if token == 'X' and diff_sec == 0:
-                    return 'Z'
-                elif num == 1:
-                    return '{}{:2d}'.format(sign, diff_hour) + ('{:2d}'.format(diff_min) if diff_min else '')
-                elif num == 2:
-                    return '{}{:2d}{:2d}'.format(sign, diff_hour, diff_min)
-                elif num == 3:
-                    return '{}{:2d}:{:2d}'.format(sign, diff_hour, diff_min)
-                elif num == 4:
-                    return '{}{:2d}{:2d}' '{}'.format(sign, diff_hour, diff_min, diff_frac_sec) if diff_frac_sec else ''
-                elif num == 5:
-                    return '{}{:2d}:{:2d}' ':{}'.format(sign, diff_hour, diff_min,
-                                                        diff_frac_sec) if diff_frac_sec else ''
-
-        except AttributeError:
-            return token * num
+        field = LDML_FIELDS.get(token) or _ldml_unknown(token)
+        return field(self, num)
 
     def aslocale(self, locale):
         return date(self.year, self.month, self.day, locale=locale)
@@ -961,6 +803,137 @@ class date(object):
         return jdate_from.togregorian(), jdate_to.togregorian()
 
 
+_LOCALE_NAME_KEYS = ('j_months', 'j_months_short', 'j_weekdays', 'j_weekdays_short', 'j_ampm', 'j_ampm_short',
+                     'j_quarter', 'j_quarter_short', 'j_GMT', 'j_era', 'j_era_short', 'j_era_narrow')
+_LOCALE_NAMES_FA = {key: getattr(date, key + '_fa') for key in _LOCALE_NAME_KEYS}
+_LOCALE_NAMES_EN = {key: getattr(date, key + '_en') for key in _LOCALE_NAME_KEYS}
+
+def _strftime_hour(d, fmt, default):
+    try:
+        return fmt % d.hour
+    except AttributeError:
+        return default
+
+
+def _strftime_hour12(d, fmt):
+    try:
+        return fmt % (d.hour % 12 or 12)
+    except AttributeError:
+        return '12'
+
+
+def _strftime_minute(d, fmt, default):
+    try:
+        return fmt % d.minute
+    except AttributeError:
+        return default
+
+
+def _strftime_second(d, fmt, default):
+    try:
+        return fmt % d.second
+    except AttributeError:
+        return default
+
+
+def _strftime_microsecond(d):
+    try:
+        return '%06.d' % d.microsecond
+    except AttributeError:
+        return '000000'
+
+
+def _strftime_ampm(d):
+    try:
+        return d.j_ampm_short[int(d.hour >= 12)]
+    except AttributeError:
+        return d.j_ampm[0]
+
+
+def _strftime_utcoffset(d):
+    try:
+        sign = "+"
+        diff = d.tzinfo.utcoffset(d)
+        diff_sec = diff.seconds
+        if diff.days > 0 or diff.days < -1:
+            raise ValueError(
+                "tzinfo.utcoffset() returned big time delta! ; must be in -1439 .. 1439")
+        if diff.days != 0:
+            sign = "-"
+            diff_sec = (1 * 24 * 60 * 60) - diff_sec
+        tmp_min = diff_sec / 60
+        diff_hour = tmp_min / 60
+        diff_min = tmp_min % 60
+        return '%s%02.d%02.d' % (sign, diff_hour, diff_min)
+    except AttributeError:
+        return ''
+
+
+def _strftime_tzname(d):
+    try:
+        return d.tzinfo.tzname(d)
+    except AttributeError:
+        return ''
+
+
+# strftime directives and the functions rendering them, matching date._strftime_replace
+STRFTIME_DIRECTIVES = {
+    '%a': lambda d: d.j_weekdays_short[d.weekday()],
+    '%A': lambda d: d.j_weekdays[d.weekday()],
+    '%b': lambda d: d.j_months_short[d.month - 1],
+    '%B': lambda d: d.j_months[d.month - 1],
+    '%c': lambda d: d.strftime("%a %d %b %Y, %H:%M:%S"),
+    '%d': lambda d: '%02.d' % d.day,
+    '%-d': lambda d: '%d' % d.day,
+    '%f': _strftime_microsecond,
+    '%H': lambda d: _strftime_hour(d, '%02.d', '00'),
+    '%-H': lambda d: _strftime_hour(d, '%d', '0'),
+    '%I': lambda d: _strftime_hour12(d, '%02.d'),
+    '%-I': lambda d: _strftime_hour12(d, '%d'),
+    '%j': lambda d: '%03.d' % d.yday(),
+    '%m': lambda d: '%02.d' % d.month,
+    '%-m': lambda d: '%d' % d.month,
+    '%M': lambda d: _strftime_minute(d, '%02.d', '00'),
+    '%-M': lambda d: _strftime_minute(d, '%d', '0'),
+    '%p': _strftime_ampm,
+    '%S': lambda d: _strftime_second(d, '%02.d', '00'),
+    '%-S': lambda d: _strftime_second(d, '%d', '0'),
+    '%w': lambda d: str(d.weekday()),
+    '%W': lambda d: str(d.weeknumber()),
+    '%x': lambda d: d.strftime("%Y/%m/%d"),
+    '%X': lambda d: d.strftime('%H:%M:%S'),
+    '%Y': lambda d: str(d.year),
+    '%y': lambda d: str(d.year)[2:],
+    '%z': _strftime_utcoffset,
+    '%Z': _strftime_tzname,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_strftime(fmt):
+    """Compile a strftime format into a tuple of literal strings and directive functions.
+
+    Returns None when a '%' starts no known directive: sequential replacement may then build directives
+    out of rendered text (e.g. '%%a'), and only date._strftime_replace reproduces that output.
+    """
+    plan = []
+    literal_start = idx = 0
+    while True:
+        idx = fmt.find('%', idx)
+        if idx == -1:
+            break
+        directive = fmt[idx:idx + 3] if fmt[idx + 1:idx + 2] == '-' else fmt[idx:idx + 2]
+        if directive not in STRFTIME_DIRECTIVES:
+            return None
+        if idx > literal_start:
+            plan.append(fmt[literal_start:idx])
+        plan.append(STRFTIME_DIRECTIVES[directive])
+        idx = literal_start = idx + len(directive)
+    if literal_start < len(fmt):
+        plan.append(fmt[literal_start:])
+    return tuple(plan)
+
+
 PATTERN_CHARS = {  # note: 'g', 'j', 'J', 'C', 'b' and 'B' are not implemented
     'G': [1, 2, 3, 4, 5],  # era
     'y': None, 'Y': None, 'U': None, 'u': None, 'r': None,  # year
@@ -1049,9 +1022,292 @@ def _tokenize_pattern(pattern):
     return result
 
 
+def _ldml_era(d, num):
+    if num < 4:
+        return d.j_era_short[int(d.year >= 0)]
+    elif num == 4:
+        return d.j_era[int(d.year >= 0)]
+    elif num == 5:
+        return d.j_era_narrow[int(d.year >= 0)]
+
+
+def _ldml_year(d, num):
+    year = abs(d.year)
+    if num == 2:
+        return '{}'.format(str(year)[-2:]) if year > 9 else '{:02d}'.format(year)
+    else:
+        return '{:0{}d}'.format(year, num)
+
+
+def _ldml_quarter(d, num):
+    quarter = (d.month - 1) // 3
+    if num < 3:
+        return '{:0{}d}'.format(quarter + 1, num)
+    elif num == 4:
+        return d.j_quarter[quarter]
+    elif num == 5 and not d._is_fa_locale():
+        return '{:d}'.format(quarter)
+    else:  # 3 or 5, short nd narrow are the same
+        return d.j_quarter_short[quarter]
+
+
+def _ldml_month(d, num):
+    if num < 3:
+        return '{:0{}d}'.format(d.month, num)
+    elif num == 3:
+        return d.j_months_short[d.month - 1]
+    elif num == 4:
+        return d.j_months[d.month - 1]
+    elif num == 5:
+        return d.j_months[d.month - 1][0]
+
+
+def _ldml_weekday_name(d, num):
+    if num == 3:
+        return d.j_weekdays_short[d.weekday()]
+    elif num == 4:
+        return d.j_weekdays[d.weekday()]
+    elif num == 5:
+        return d.j_weekdays[d.weekday()][0]
+    elif num == 6:
+        return d.j_weekdays[d.weekday()][:2]
+
+
+def _ldml_day_of_week_in_month(d, num):
+    # if dayofweek of d is equal or greater than first of month, it should be equal to d.weekofmonth()
+    # otherwise, it is one less because first week of month does not have d.weekday (it starts later)
+    return '{:d}'.format(d.weekofmonth() - int(d.weekday() < d.replace(day=1).weekday()))
+
+
+def _ldml_ampm(d, num):
+    if num < 4:
+        return d.j_ampm_short[int(d.hour >= 12)]
+    elif num == 4:
+        return d.j_ampm[int(d.hour >= 12)]
+    elif num == 5:
+        return d.j_ampm[int(d.hour >= 12)][0]
+
+
+def _ldml_milliseconds_in_day(d, num):
+    ms = int(((d.hour * 60 + d.minute) * 60 + d.second) * 1000 + d.microsecond / 1000)
+    # note: babel rounds microseconds but LDML specifies it should be truncated
+    return '{:0{}d}'.format(ms, num)
+
+
+def _ldml_utcoffset(d):
+    """Return (sign, hours, minutes, total seconds, seconds remainder) of the utc offset of d."""
+    sign = "+"
+    diff = d.tzinfo.utcoffset(d)
+    diff_sec = diff.seconds
+    if diff.days > 0 or diff.days < -1:
+        raise ValueError(
+            "tzinfo.utcoffset() returned big time delta! ; must be in -1439 .. 1439")
+    if diff.days != 0:
+        sign = "-"
+        diff_sec = (1 * 24 * 60 * 60) - diff_sec
+    tmp_min = diff_sec // 60
+    return sign, tmp_min // 60, tmp_min % 60, diff_sec, diff_sec % 60
+
+
+def _ldml_zone_z(d, num):
+    sign, diff_hour, diff_min, diff_sec, diff_frac_sec = _ldml_utcoffset(d)
+    if num < 4:
+        return '{}{:02d}{:02d}'.format(sign, diff_hour, diff_min)
+    elif num == 4:
+        return '{}{}{:d}:{:02d}'.format(d.j_GMT, sign, diff_hour, diff_min)
+    elif num == 5:
+        if diff_sec == 0:
+            return 'Z'
+        return '{}{:02d}:{:02d}'.format(sign, diff_hour, diff_min) + ':{}'.format(
+            diff_frac_sec) if diff_frac_sec else ''
+
+
+def _ldml_zone_o(d, num):
+    sign, diff_hour, diff_min, diff_sec, diff_frac_sec = _ldml_utcoffset(d)
+    if num == 1:
+        return '{}{}{:d}'.format(d.j_GMT, sign, diff_hour) + ('{:d}'.format(diff_min) if diff_min else '')
+    elif num == 4:
+        return '{}{}{:02d}:{:02d}'.format(d.j_GMT, sign, diff_hour, diff_min)
+
+
+def _ldml_zone_x(d, num, utc_z=False):
+    sign, diff_hour, diff_min, diff_sec, diff_frac_sec = _ldml_utcoffset(d)
+    if utc_z and diff_sec == 0:
+        return 'Z'
+    elif num == 1:
+        return '{}{:2d}'.format(sign, diff_hour) + ('{:2d}'.format(diff_min) if diff_min else '')
+    elif num == 2:
+        return '{}{:2d}{:2d}'.format(sign, diff_hour, diff_min)
+    elif num == 3:
+        return '{}{:2d}:{:2d}'.format(sign, diff_hour, diff_min)
+    elif num == 4:
+        return '{}{:2d}{:2d}' '{}'.format(sign, diff_hour, diff_min, diff_frac_sec) if diff_frac_sec else ''
+    elif num == 5:
+        return '{}{:2d}:{:2d}' ':{}'.format(sign, diff_hour, diff_min,
+                                            diff_frac_sec) if diff_frac_sec else ''
+
+
+def _ldml_time_field(token, field):
+    """Wrap a time field so that a date object (or a naive datetime for zone fields) leaves it untouched."""
+
+    def render(d, num):
+        try:
+            return field(d, num)
+        except AttributeError:
+            return token * num
+    return render
+
+
+def _ldml_no_field(d, num):
+    d.tzinfo.utcoffset(d)
+
+
+def _ldml_unknown(token):
+    """Field without a renderer: left untouched unless the value carries a timezone."""
+    return _ldml_time_field(token, _ldml_no_field)
+
+
+# LDML field characters and the functions rendering them as field(d, num)
+LDML_FIELDS = {
+    'G': _ldml_era,
+    'y': _ldml_year, 'Y': _ldml_year, 'U': _ldml_year,
+    'u': lambda d, num: '{:0{}d}'.format(d.year, num),
+    'r': lambda d, num: '{:0{}d}'.format(d.year + 621, num),
+    'Q': _ldml_quarter, 'q': _ldml_quarter,
+    'M': _ldml_month, 'L': _ldml_month,
+    'w': lambda d, num: '{:0{}d}'.format(d.weeknumber(), num),
+    'W': lambda d, num: '{:d}'.format(d.weekofmonth()),
+    'd': lambda d, num: '{:0{}d}'.format(d.day, num),
+    'D': lambda d, num: '{:0{}d}'.format(d.yday(), num),
+    'F': _ldml_day_of_week_in_month,
+    'E': lambda d, num: d.j_weekdays_short[d.weekday()] if num < 4 else _ldml_weekday_name(d, num),
+    'e': lambda d, num: '{:0{}d}'.format(d.weekday(), num) if num < 3 else _ldml_weekday_name(d, num),
+    'c': lambda d, num: '{:d}'.format(d.weekday()) if num < 3 else _ldml_weekday_name(d, num),
+    'a': _ldml_time_field('a', _ldml_ampm),
+    'h': _ldml_time_field('h', lambda d, num: '{:0{}d}'.format(d.hour % 12 or 12, num)),
+    'H': _ldml_time_field('H', lambda d, num: '{:0{}d}'.format(d.hour, num)),
+    'k': _ldml_time_field('k', lambda d, num: '{:0{}d}'.format(d.hour % 12, num)),
+    'K': _ldml_time_field('K', lambda d, num: '{:0{}d}'.format(d.hour + 1, num)),
+    'm': _ldml_time_field('m', lambda d, num: '{:0{}d}'.format(d.minute, num)),
+    's': _ldml_time_field('s', lambda d, num: '{:0{}d}'.format(d.second, num)),
+    # note: babel rounds microseconds but LDML specifies it should be truncated
+    'S': _ldml_time_field('S', lambda d, num: '{:0<{}}'.format(str(d.microsecond)[:num], num)),
+    'A': _ldml_time_field('A', _ldml_milliseconds_in_day),
+    # it needs a hell amount of data, we just tzname
+    'z': _ldml_time_field('z', lambda d, num: d.tzinfo.tzname(d)),
+    'v': _ldml_time_field('v', lambda d, num: d.tzinfo.tzname(d)),
+    'V': _ldml_time_field('V', lambda d, num: d.tzinfo.tzname(d)),
+    'Z': _ldml_time_field('Z', _ldml_zone_z),
+    'O': _ldml_time_field('O', _ldml_zone_o),
+    'X': _ldml_time_field('X', lambda d, num: _ldml_zone_x(d, num, utc_z=True)),
+    'x': _ldml_time_field('x', _ldml_zone_x),
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_pattern(pattern):
+    """Compile an LDML pattern into a tuple of literal strings and (field, num, translate) triples.
+
+    Field lengths are validated against PATTERN_CHARS once, when the pattern is compiled.
+    """
+    plan = []
+    for tok_type, tok_value in _tokenize_pattern(pattern):
+        if tok_type == "chars":
+            plan.append(tok_value.replace('%', '%%'))
+        elif tok_type == "field":
+            fieldchar, fieldnum = tok_value
+            limit = PATTERN_CHARS[fieldchar]
+            if limit and fieldnum not in limit:
+                raise ValueError('Invalid length for field: %r'
+                                 % (fieldchar * fieldnum))
+            plan.append((LDML_FIELDS.get(fieldchar) or _ldml_unknown(fieldchar), fieldnum, fieldchar != 'r'))
+        else:
+            raise NotImplementedError("Unknown token type: %s" % tok_type)
+    return tuple(plan)
+
+
+def _strptime_month_names():
+    names = {}
+    for names_list in (date.j_months_en, date.j_months_short_en, date.j_months_fa, date.j_months_short_fa):
+        for month, name in enumerate(names_list, 1):
+            names[name.lower()] = month
+    return names
+
+
+_STRPTIME_MONTH_NAMES = _strptime_month_names()
+
+# strptime directives: (regex, field); longer month names come first so that they win over their abbreviation
+STRPTIME_DIRECTIVES = {
+    'd': ('[0-9]{1,2}', 'day'),
+    'f': ('[0-9]{1,6}', 'microsecond'),
+    'H': ('[0-9]{1,2}', 'hour'),
+    'j': ('[0-9]{1,3}', 'yday'),
+    'm': ('[0-9]{1,2}', 'month'),
+    'M': ('[0-9]{1,2}', 'minute'),
+    'S': ('[0-9]{1,2}', 'second'),
+    'y': ('[0-9]{2}', 'short_year'),
+    'Y': ('[0-9]{4,5}', 'year'),
+    'b': ('(?i:%s)' % '|'.join(_re.escape(name) for name in sorted(_STRPTIME_MONTH_NAMES, key=len, reverse=True)),
+          'month_name'),
+}
+STRPTIME_DIRECTIVES['B'] = STRPTIME_DIRECTIVES['b']
+for _directive in ('d', 'H', 'm', 'M', 'S'):
+    STRPTIME_DIRECTIVES['-' + _directive] = STRPTIME_DIRECTIVES[_directive]
+
+_STRPTIME_TOKEN = _re.compile('%(-?[a-zA-Z]|%)')
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_strptime(format):
+    """Compile a strptime format into a regex and the field each of its groups fills.
+
+    Text outside directives, and directives strptime does not support, must match literally.
+    """
+    regex = []
+    fields = []
+    pos = 0
+    for token in _STRPTIME_TOKEN.finditer(format):
+        regex.append(_re.escape(format[pos:token.start()]))
+        directive = token.group(1)
+        if directive == '%':
+            regex.append('%')
+        elif directive in STRPTIME_DIRECTIVES:
+            pattern, field = STRPTIME_DIRECTIVES[directive]
+            regex.append('(' + pattern + ')')
+            fields.append(field)
+        else:
+            regex.append(_re.escape(token.group(0)))
+        pos = token.end()
+    regex.append(_re.escape(format[pos:]))
+    return _re.compile(''.join(regex)), tuple(fields)
+
+
+def _strptime_values(fields, groups):
+    """Return the datetime arguments parsed from the matched groups."""
+    values = {'year': 1279, 'month': 1, 'day': 1, 'hour': 0, 'minute': 0, 'second': 0, 'microsecond': 0}
+    yday = None
+    for field, text in zip(fields, groups):
+        if field == 'month_name':
+            values['month'] = _STRPTIME_MONTH_NAMES[text.lower()]
+        elif field == 'short_year':
+            year = int(text)
+            values['year'] = year + (1400 if year < 69 else 1300)
+        elif field == 'microsecond':
+            values['microsecond'] = int(text.ljust(6, '0'))
+        elif field == 'yday':
+            yday = int(text)
+        else:
+            values[field] = int(text)
+    if yday is not None:
+        year, values['month'], values['day'] = ordinal_to_jalali(jalali_to_ordinal(values['year'], 1, 1) + yday - 1)
+        if year != values['year']:
+            raise ValueError('day of year %s is out of range' % yday)
+    return values
+
+
 class datetime(date):
     """datetime(year, month, day, [hour, [minute, [seconds, [microsecond, [tzinfo]]]]]) --> datetime objects"""
-    __time = None
+    __slots__ = ('__time',)
 
     def time(self):
         """Return time object with same time but with tzinfo=None."""
@@ -1240,9 +1496,8 @@ class datetime(date):
         """int -> date corresponding to a proleptic Jalali ordinal. it starts from Farvardin 1 of year 1, which is equal to 622-3-21 of Gregorian"""
         if ordinal < 1:
             raise ValueError("ordinal must be >= 1")
-        d = py_datetime.date.fromordinal(226894 + ordinal)
-        j_date = date.fromgregorian(date=d)
-        return datetime(j_date.year, j_date.month, j_date.day, 0, 0)
+        (y, m, d) = ordinal_to_jalali(ordinal)
+        return datetime(y, m, d, 0, 0)
 
     @property
     def hour(self):
@@ -1267,57 +1522,13 @@ class datetime(date):
     @staticmethod
     def strptime(date_string, format):
         """string, format -> new datetime parsed from a string (like time.strptime())"""
-        dt_string = date_string.translate(number_converter)
-
-        if '*' in format:
-            format = format.replace("*", "\*")
-        if '+' in format:
-            format = format.replace("+", "\+")
-        if '(' in format or ')' in format:
-            format = format.replace("(", "\(")
-            format = format.replace(")", "\)")
-        if '[' in format or ']' in format:
-            format = format.replace("[", "\[")
-            format = format.replace("]", "\]")
-        result_date = {
-            'day': 1,
-            'month': 1,
-            'year': 1279,
-            'microsecond': 0,
-            'second': 0,
-            'minute': 0,
-            'hour': 0}
-        apply_order = []
-        format_map = {
-            '%d': ['[0-9]{1,2}', 'day'],
-            '%f': ['[0-9]{1,6}', 'microsecond'],
-            '%H': ['[0-9]{1,2}', 'hour'],
-            '%m': ['[0-9]{1,2}', 'month'],
-            '%M': ['[0-9]{1,2}', 'minute'],
-            '%S': ['[0-9]{1,2}', 'second'],
-            '%Y': ['[0-9]{4,5}', 'year'],
-        }
-        regex = format
-        find = _re.compile("(%[a-zA-Z])")
-
-        for form in find.findall(format):
-            if form in format_map:
-                regex = regex.replace(form, "(" + format_map[form][0] + ")")
-                apply_order.append(format_map[form][1])
+        regex, fields = _compile_strptime(format)
+        match = regex.match(date_string.translate(number_converter))
         try:
-            p = _re.compile(regex)
-            if not p.match(dt_string):
+            if not match:
                 raise ValueError()
-            for i, el in enumerate(p.match(dt_string).groups()):
-                result_date[apply_order[i]] = int(el)
-            return datetime(
-                result_date['year'],
-                result_date['month'],
-                result_date['day'],
-                result_date['hour'],
-                result_date['minute'],
-                result_date['second'])
-        except:
+            return datetime(**_strptime_values(fields, match.groups()))
+        except ValueError:
             raise ValueError(
                 "time data '%s' does not match format '%s'" %
                 (date_string, format))
@@ -1484,6 +1695,10 @@ class datetime(date):
         gdt = self.togregorian()
         return gdt.__hash__()
 
+    def __reduce__(self):
+        return _reconstruct, (self.__class__, (self.year, self.month, self.day, self.hour, self.minute, self.second,
+                                               self.microsecond, self.tzinfo), self.locale)
+
     def __le__(self, other_datetime):
         """x.__le__(y) <==> x<=y"""
         if isinstance(other_datetime, datetime):
@@ -1529,9 +1744,7 @@ class datetime(date):
         date_param = kw.get('date') or kw.get('datetime')
         if date_param:
             try:
-                (y, m, d) = GregorianToJalali(date_param.year,
-                                              date_param.month,
-                                              date_param.day).getJalaliList()
+                (y, m, d) = ordinal_to_jalali(date_param.toordinal() - GREGORIAN_ORDINAL_OFFSET)
             except AttributeError:
                 raise ValueError(
                     'When calling fromgregorian(date=) or fromgregorian(datetime=) the parameter should be date like.')
@@ -1550,8 +1763,8 @@ class datetime(date):
                 return datetime(y, m, d, locale=locale)
 
         if 'day' in kw and 'month' in kw and 'year' in kw:
-            (year, month, day) = (kw['year'], kw['month'], kw['day'])
-            (y, m, d) = GregorianToJalali(year, month, day).getJalaliList()
+            gdate = py_datetime.date(kw['year'], kw['month'], kw['day'])
+            (y, m, d) = ordinal_to_jalali(gdate.toordinal() - GREGORIAN_ORDINAL_OFFSET)
             hour = None
             minute = None
             second = None
@@ -1,6 +1,13 @@
 #dervied from http://farsitools.sf.net
 #Copyright (C) 2003-2011  Parspooyesh Fanavar (http://parspooyesh.com/)
 #see LICENSE.txt
+from datetime import date as _py_date
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
 g_days_in_month = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
 j_days_in_month = [31, 31, 31, 31, 31, 31, 30, 30, 30, 30, 30, 29]
 
@@ -129,3 +136,107 @@ class JalaliToGregorian:
         self.gmonth = i+1
         self.gday = g_day_no+1
         self.gyear = gy
+
+
+# Closed-form conversions. Jalali ordinals start from Farvardin 1 of year 1 (622-03-21 Gregorian,
+# Gregorian ordinal 226895); the arithmetic is the one of the classes above, without month table loops.
+GREGORIAN_ORDINAL_OFFSET = 226894
+j_days_before_month = (0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336)
+# Gregorian ordinal of 1600-01-01 plus the 79 days between it and 979-01-01 Jalali
+_J_EPOCH_OFFSET = 584023 + 79 - GREGORIAN_ORDINAL_OFFSET
+
+
+def jalali_to_ordinal(jyear, jmonth, jday):
+    """Return the proleptic Jalali ordinal of the given Jalali date."""
+    jy = jyear - 979
+    return (365 * jy + (jy // 33) * 8 + (jy % 33 + 3) // 4 + j_days_before_month[jmonth - 1] + jday - 1
+            + _J_EPOCH_OFFSET)
+
+
+def ordinal_to_jalali(ordinal):
+    """Return the (year, month, day) tuple of the given proleptic Jalali ordinal."""
+    j_day_no = ordinal - _J_EPOCH_OFFSET
+    jy = 979 + 33 * (j_day_no // 12053)
+    j_day_no %= 12053
+    jy += 4 * (j_day_no // 1461)
+    j_day_no %= 1461
+    if j_day_no >= 366:
+        jy += (j_day_no - 1) // 365
+        j_day_no = (j_day_no - 1) % 365
+    if j_day_no < 186:
+        return jy, j_day_no // 31 + 1, j_day_no % 31 + 1
+    j_day_no -= 186
+    return jy, j_day_no // 30 + 7, j_day_no % 30 + 1
+
+
+def gregorian_to_jalali(gyear, gmonth, gday):
+    """Return the Jalali (year, month, day) tuple of the given Gregorian date."""
+    return ordinal_to_jalali(_py_date(gyear, gmonth, gday).toordinal() - GREGORIAN_ORDINAL_OFFSET)
+
+
+def jalali_to_gregorian(jyear, jmonth, jday):
+    """Return the Gregorian (year, month, day) tuple of the given Jalali date."""
+    g = _py_date.fromordinal(jalali_to_ordinal(jyear, jmonth, jday) + GREGORIAN_ORDINAL_OFFSET)
+    return g.year, g.month, g.day
+
+
+# Bulk conversions, vectorized with NumPy when it is installed and falling back to the scalar functions.
+_UNIX_EPOCH_ORDINAL = 719163  # Gregorian ordinal of 1970-01-01
+
+
+def _to_gregorian_ordinals(values):
+    """Return the Gregorian ordinals of an array of ordinals, datetime64 values or date objects."""
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[D]').astype(np.int64) + _UNIX_EPOCH_ORDINAL
+    if values.dtype.kind == 'O':
+        return np.fromiter((value.toordinal() for value in values.ravel()), np.int64,
+                           count=values.size).reshape(values.shape)
+    return values.astype(np.int64)
+
+
+def gregorian_to_jalali_many(values):
+    """Convert many Gregorian dates to Jalali at once.
+
+    values may hold Gregorian ordinals, numpy ``datetime64`` values or ``datetime.date`` objects.
+    Returns a (years, months, days) tuple of int arrays, or of lists when NumPy is not installed.
+    """
+    if np is None:
+        dates = [ordinal_to_jalali((value if isinstance(value, int) else value.toordinal())
+                                   - GREGORIAN_ORDINAL_OFFSET) for value in values]
+        return [d[0] for d in dates], [d[1] for d in dates], [d[2] for d in dates]
+
+    j_day_no = _to_gregorian_ordinals(values) - (GREGORIAN_ORDINAL_OFFSET + _J_EPOCH_OFFSET)
+    years = 979 + 33 * (j_day_no // 12053)
+    j_day_no %= 12053
+    years += 4 * (j_day_no // 1461)
+    j_day_no %= 1461
+    late = j_day_no >= 366
+    years += np.where(late, (j_day_no - 1) // 365, 0)
+    j_day_no = np.where(late, (j_day_no - 1) % 365, j_day_no)
+    first_half = j_day_no < 186
+    second_half_day_no = j_day_no - 186
+    months = np.where(first_half, j_day_no // 31 + 1, second_half_day_no // 30 + 7)
+    days = np.where(first_half, j_day_no % 31 + 1, second_half_day_no % 30 + 1)
+    return years, months, days
+
+
+def jalali_to_gregorian_many(years, months, days, datetime64=False):
+    """Convert many Jalali dates to Gregorian at once.
+
+    Returns the Gregorian ordinals as an int array, or a ``datetime64[D]`` array when ``datetime64`` is set.
+    Without NumPy, a list of ordinals is returned, or of ``datetime.date`` when ``datetime64`` is set.
+    """
+    if np is None:
+        ordinals = [jalali_to_ordinal(y, m, d) + GREGORIAN_ORDINAL_OFFSET for y, m, d in zip(years, months, days)]
+        return [_py_date.fromordinal(ordinal) for ordinal in ordinals] if datetime64 else ordinals
+
+    jy = np.asarray(years, dtype=np.int64) - 979
+    ordinals = (365 * jy + (jy // 33) * 8 + (jy % 33 + 3) // 4
+                + np.asarray(j_days_before_month, dtype=np.int64)[np.asarray(months, dtype=np.int64) - 1]
+                + np.asarray(days, dtype=np.int64) - 1
+                + _J_EPOCH_OFFSET + GREGORIAN_ORDINAL_OFFSET)
+    if datetime64:
+        return (ordinals - _UNIX_EPOCH_ORDINAL).astype('datetime64[D]')
+    return ordinals
+
@@ -1,7 +1,8 @@
 """Provide functions to convert a number to Persian words."""
 
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 from fractions import Fraction
+from functools import lru_cache as _lru_cache
 try:
     from functools import singledispatch as _singledispatch
 except ImportError:  # pragma: no cover
@@ -9,7 +10,7 @@ except ImportError:  # pragma: no cover
     # noinspection PyUnresolvedReferences
     from singledispatch import singledispatch as _singledispatch
 from itertools import chain as _chain
-from typing import Union as _Union
+from typing import Iterable as _Iterable, Iterator as _Iterator, Union as _Union
 
 
 ONES = [
@@ -85,6 +86,8 @@ DECIMAL_PLACES.extend(_chain.from_iterable(
     for i in (i + 'م' for i in CLASSES[1:])
 ))
 
+_MAX_NATURAL = 1000 ** len(CLASSES)
+
 _NORMALIZATION_TABLE = str.maketrans('E٫', 'e.', '_٬,+')
 
 
@@ -104,6 +107,9 @@ def _three_digit_words(number: int) -> str:
     return w + ONES[o]
 
 
+_THREE_DIGIT_WORDS = tuple(_three_digit_words(n) for n in range(1000))
+
+
 # noinspection PyUnusedLocal
 @_singledispatch
 def words(
@@ -218,8 +224,13 @@ def _(
     if number == 0:
         return 'صفر'
     if number < 0:
-        return negative + _natural_words(str(number)[1:])
-    return positive + _natural_words(str(number))
+        number = -number
+        sign = negative
+    else:
+        sign = positive
+    if number >= _MAX_NATURAL:
+        raise ValueError('out of range')
+    return sign + _int_words(number)
 
 
 # noinspection PyUnusedLocal
@@ -292,32 +303,23 @@ def _point_words(
 def _natural_words(str_num: str) -> str:
     if str_num == '0':
         return 'صفر'
-    length = len(str_num)
-    if length > len(CLASSES) * 3:
+    if len(str_num) > len(CLASSES) * 3:
         raise ValueError('out of range')
+    return _int_words(int(str_num))
+
 
-    modulo_3 = length % 3
-    if modulo_3:
-        str_num = '0' * (3 - modulo_3) + str_num
-        length += 3 - modulo_3
-
-    groups = length // 3
-    group = groups
-    natural_words = ''
-    while group > 0:
-        three_digit = str_num[group * 3 - 3:group * 3]
-        word3 = _three_digit_words(int(three_digit))
-        if word3 and group != groups:
-            if natural_words:
-                natural_words = word3 + CLASSES[groups - group] + \
-                                ' و ' + natural_words
-            else:
-                natural_words = word3 + CLASSES[groups - group]
-        else:
-            natural_words = word3 + natural_words
-        group -= 1
-
-    return natural_words
+def _int_words(number: int) -> str:
+    """Return the word representation of 0 <= number < 1000 ** len(CLASSES)."""
+    # non-zero three-digit groups, from the lowest class up
+    parts = []
+    class_index = 0
+    while number:
+        number, three_digit = divmod(number, 1000)
+        if three_digit:
+            parts.append(_THREE_DIGIT_WORDS[three_digit] + CLASSES[class_index])
+        class_index += 1
+    parts.reverse()
+    return ' و '.join(parts)
 
 
 def ordinal_words(
@@ -332,6 +334,122 @@ def ordinal_words(
     return w + 'م'
 
 
+def words_many(numbers: _Iterable, **options) -> _Iterator[str]:
+    """Yield the word form of each number, as words(number, **options) would.
+
+    The words implementation is resolved once per input type and repeated
+    values are converted once per call.
+
+    """
+    implementations = {}
+    converted = {}
+    for number in numbers:
+        number_type = number.__class__
+        # equal Decimals may differ in their exponent, and so in their words
+        key = (number_type, str(number) if number_type is Decimal else number)
+        try:
+            yield converted[key]
+            continue
+        except KeyError:
+            pass
+        implementation = implementations.get(number_type)
+        if implementation is None:
+            implementation = implementations[number_type] = words.dispatch(number_type)
+        converted[key] = text = implementation(number, **options)
+        yield text
+
+
+def amount_words(amount: _Union[int, float, Decimal]) -> str:
+    """Return the word form of a monetary amount.
+
+    Amounts are normalized to Decimal, so 1500, 1500.0 and Decimal('1500.00')
+    share one cache entry, and rendered in positional notation. Results are
+    memoized per amount and active defaults; use amount_words.cache_info() for
+    the hit and miss counters.
+
+    """
+    if isinstance(amount, float):
+        amount = repr(amount)
+    return _cached_amount_words(Decimal(amount).normalize(), change_defaults.__defaults__)
+
+
+def currency_words(
+    amount: _Union[int, float, Decimal],
+    rounding: _Union[int, float, Decimal] = 1,
+) -> str:
+    """Return the word form of a monetary amount in a currency.
+
+    rounding is the smallest unit of the currency, e.g. res.currency.rounding.
+    The amount is converted to Decimal exactly, without going through its
+    float string, and rounded half-up to a multiple of rounding, so float
+    noise and large Rial amounts read as natural words. Results share the
+    amount_words cache.
+
+    """
+    amount = _positional_amount(amount, _rounding_quantum(rounding))
+    return _cached_amount_words(amount.normalize(), change_defaults.__defaults__)
+
+
+def currency_words_many(
+    amounts: _Iterable,
+    rounding: _Union[int, float, Decimal] = 1,
+) -> _Iterator[str]:
+    """Yield currency_words(amount, rounding) of each amount in one words_many pass.
+
+    The amounts are rounded like currency_words does and handed to
+    words_many in positional notation, so a recordset's amounts resolve the
+    words implementation once and repeated amounts are converted once.
+
+    """
+    quantum = _rounding_quantum(rounding)
+    return words_many(_positional_amount(amount, quantum) for amount in amounts)
+
+
+def _positional_amount(amount: _Union[int, float, Decimal], quantum: Decimal) -> Decimal:
+    amount = (Decimal(amount) / quantum).to_integral_value(ROUND_HALF_UP) * quantum
+    # words reads a Decimal as written: no trailing zeros, exponent or negative zero
+    return Decimal(format(amount.normalize(), 'f')) if amount else Decimal(0)
+
+
+@_lru_cache(maxsize=64)
+def _rounding_quantum(rounding: _Union[int, float, Decimal]) -> Decimal:
+    if isinstance(rounding, float):
+        rounding = repr(rounding)
+    return Decimal(rounding)
+
+
+@_lru_cache(maxsize=4096)
+def _cached_amount_words(amount: Decimal, defaults: tuple) -> str:
+    positive, negative, decimal_separator = defaults[:3]
+    if not amount:
+        return 'صفر'
+    sign = negative if amount < 0 else positive
+    integral = abs(int(amount))
+    exponent = amount.as_tuple().exponent
+    if exponent >= 0:
+        fraction = places = 0
+    else:
+        places = -exponent
+        fraction = abs(int(amount.scaleb(places))) - integral * 10 ** places
+    if integral >= _MAX_NATURAL or places >= len(DECIMAL_PLACES):
+        raise ValueError('out of range')
+    if not fraction:
+        return sign + _int_words(integral)
+    if not integral:
+        return sign + _int_words(fraction) + DECIMAL_PLACES[places]
+    return (
+        sign
+        + _int_words(integral)
+        + decimal_separator
+        + _int_words(fraction)
+        + DECIMAL_PLACES[places]
+    )
+
+
+amount_words.cache_info = _cached_amount_words.cache_info
+amount_words.cache_clear = _cached_amount_words.cache_clear
+
+
 def change_defaults(
     positive: str = '',
     negative: str = 'منفی ',
@@ -349,3 +467,4 @@ def change_defaults(
     for func in words.registry.values():
         func.__defaults__ = defaults
     ordinal_words.__defaults__ = (positive, negative)
+    _cached_amount_words.cache_clear()